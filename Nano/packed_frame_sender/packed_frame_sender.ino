@@ -0,0 +1,92 @@
+/*
+  Packed Frame Protocol – 18 bytes per 4 sample sets (1.5 bytes per reading)
+  Frame format:
+    [0xA5 sync] [sequence] [15 bytes: 12 × 10-bit readings] [CRC-8]
+  - Readings in order A0, A1, A2 of set 1, then of set 2, ... packed MSB first
+  - Sequence counts frames (wraps at 255), a jump means frames were lost
+  - CRC-8 (polynomial 0x07, initial value 0) over sequence + readings
+  With SEND_TIMESTAMPS, 20 bytes per frame:
+    [0xA6 sync] [sequence] [micros() & 0xFFFF of set 1, MSB first] [15 bytes readings] [CRC-8]
+  - CRC-8 then also covers the timestamp
+  Decoded by PackedFrameDecoder in Raspberry/frame_decoder.py (timestamps=True for SEND_TIMESTAMPS)
+*/
+
+const int sensorPins[3] = {A0, A1, A2};  // Sensor 1, 2, 3
+
+const bool SEND_TIMESTAMPS = false;          // lets the Pi use the Nano's sample clock
+const uint8_t SYNC = SEND_TIMESTAMPS ? 0xA6 : 0xA5;
+const uint8_t FRAME_SIZE = SEND_TIMESTAMPS ? 20 : 18;
+const uint8_t PAYLOAD_START = SEND_TIMESTAMPS ? 4 : 2;
+const uint8_t SETS_PER_FRAME = 4;
+const unsigned long SAMPLE_PERIOD_US = 500;  // 2000 sets/s, ~78 % (~87 % with timestamps) of 115200 baud
+
+uint8_t frame[20];
+uint8_t sequence = 0;
+uint8_t setIndex = 0;
+unsigned long nextSample;
+
+// Bit position in the payload where the next reading goes
+uint8_t bitPos = 0;
+
+
+void setup() {
+  Serial.begin(115200);  // Standard 8N1
+  analogReference(EXTERNAL);
+
+  for (int i = 0; i < 3; i++) {
+    pinMode(sensorPins[i], INPUT);
+  }
+  nextSample = micros();
+}
+
+uint8_t crc8(const uint8_t *data, uint8_t length) {
+  uint8_t crc = 0;
+  for (uint8_t i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Appends one 10-bit reading to the frame payload, MSB first
+void packReading(uint16_t value) {
+  value &= 0x03FF;
+  for (int8_t bit = 9; bit >= 0; bit--) {
+    uint8_t index = PAYLOAD_START + bitPos / 8;
+    uint8_t mask = 0x80 >> (bitPos % 8);
+    if (value & (1 << bit)) {
+      frame[index] |= mask;
+    } else {
+      frame[index] &= ~mask;
+    }
+    bitPos++;
+  }
+}
+
+void loop() {
+  // Fixed sample clock instead of delay(1), so the set rate does not depend on the loop time
+  if ((long)(micros() - nextSample) < 0) {
+    return;
+  }
+  nextSample += SAMPLE_PERIOD_US;
+
+  if (setIndex == 0 && SEND_TIMESTAMPS) {
+    uint16_t stamp = micros();         // the Pi sums the differences, so 16 bits are enough
+    frame[2] = stamp >> 8;
+    frame[3] = stamp & 0xFF;
+  }
+  for (int i = 0; i < 3; i++) {
+    packReading(analogRead(sensorPins[i]));
+  }
+
+  if (++setIndex == SETS_PER_FRAME) {
+    frame[0] = SYNC;
+    frame[1] = sequence++;
+    frame[FRAME_SIZE - 1] = crc8(&frame[1], FRAME_SIZE - 2);
+    Serial.write(frame, FRAME_SIZE);     // fits the 64-byte TX buffer, does not block
+    setIndex = 0;
+    bitPos = 0;
+  }
+}
@@ -1,5 +1,6 @@
 # GUI_3.0.py – Final integrated GUI with live plotting, motor control, and UI
 import sys
+import time
 from PyQt5 import QtWidgets, QtCore
 # from PyQt5 import QtGui
 # import pyqtgraph as pg
@@ -8,31 +9,27 @@ from PyQt5 import QtWidgets, QtCore
 # import numpy as np
 from ui_elements import Ui_MainWindow
 from modbus_controller import ModbusController
+from modbus_worker import ModbusWorker
+from async_modbus_controller import AsyncModbusController
 from live_plotter import LivePlotter
 # from live_plotter_calibration_test import LivePlotter
 from sensor_reader_thread import SensorReaderThread
+from data_recorder import RecorderThread
+from latency_probe import LatencyProbe
 
+# True: Modbus runs on one asyncio loop thread (AsyncModbusController) instead of
+# ModbusController + ModbusWorker. Both report through the same signals.
+USE_ASYNC_MODBUS = False
 
-# Reuse ModbusThread from previous design
-class ModbusThread(QtCore.QThread):
-    """Thread to update motor parameters without freezing the GUI."""
+# Wire format of the Nano firmware (a key of frame_decoder.DECODERS) and its options,
+# e.g. "packed" for packed_frame_sender.ino ({"timestamps": True} with SEND_TIMESTAMPS)
+# or "voltage_lines" with {"sensor_ids": (0,)} for BP_speed.ino. ascii_packets maps the four
+# values of each packet with {"sensor_ids": (...)}, all to sensor 0 by default like the firmware
+SENSOR_PROTOCOL = "bitpacked"
+SENSOR_PROTOCOL_PARAMS = {}
 
-    def __init__(self, modbus, frequency, stroke_volume):
-        super().__init__()
-        self.modbus = modbus
-        self.frequency = frequency
-        self.stroke_volume = stroke_volume
-
-    def run(self):
-        """Send updated motor values to Modbus."""
-        try:
-            # print(f"TESTING: ModbusThread started with Frequency={self.frequency}, Stroke={self.stroke_volume}")  # Debug message
-            # set_motor_speed(self.frequency, self.stroke_volume)  # OLD
-            # set_motor_target_position(self.frequency, self.stroke_volume)  # OLD
-            self.modbus.set_motor_speed(self.frequency, self.stroke_volume)  # NEW from ModbusController CLASS
-            self.modbus.set_motor_target_position(self.frequency, self.stroke_volume)  # NEW from ModbusController CLASS
-        except Exception as e:
-            print(f"Modbus Error: {e}")
+# Plot channel fed by each sensor_id of the Nano
+SENSOR_CHANNELS = {0: "LVP", 1: "AOP", 2: "LAP"}
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -46,7 +43,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.setupUi(self)
         self.ui.devButton.clicked.connect(self.enter_developer_mode)
 
-        self.modbus = ModbusController()  # Instantiate the new ModbusController CLASS
+        if USE_ASYNC_MODBUS:
+            self.modbus = AsyncModbusController()
+            self.modbus_worker = self.modbus
+        else:
+            self.modbus = ModbusController()  # Instantiate the new ModbusController CLASS
+
+            # All bus traffic goes through one worker thread, in order
+            self.modbus_worker = ModbusWorker(self.modbus)
+        self.modbus_worker.command_finished.connect(self.on_modbus_command_finished)
+        self.modbus_worker.command_failed.connect(self.on_modbus_command_failed)
+        self.modbus_worker.connection_state_changed.connect(self.on_modbus_connection_state)
 
         # Apply dark theme stylesheet
         self.setStyleSheet("""
@@ -96,6 +103,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.is_recording = False
         self.record_start_time = None
         self.record_elapsed_time = 0
+        self.recorder = None
+        self.recording_format = "csv"   # "csv" or "binary" (settings menu), see recording_format.WRITERS
+
+        # Pipeline latency instrumentation, enabled in developer mode
+        self.latency_probe = None
 
         # Embed live plotter
         """self.plotter = LivePlotter(self)
@@ -104,16 +116,16 @@ class MainWindow(QtWidgets.QMainWindow):
         self.plotter = LivePlotter(self.ui.centralwidget)
         self.plotter.setGeometry(182, 130, 700, 430)
         self.plotter.stats_updated.connect(self.update_pressure_labels)
+        self.plotter.beat_detected.connect(self.update_pressure_labels)
         self.plotter.show()
 
-        self.plotter.stats_updated.connect(self.update_pressure_labels)
-
         # Create and setup settings menu
         self.setup_settings_menu()
 
         # Sensor Reader Thread
-        self.sensor_thread = SensorReaderThread(port="/dev/ttyUSB0")
-        self.sensor_thread.data_received.connect(self.handle_sensor_data)
+        self.sensor_thread = SensorReaderThread(port="/dev/ttyUSB0", protocol=SENSOR_PROTOCOL,
+                                                protocol_params=SENSOR_PROTOCOL_PARAMS)
+        self.sensor_thread.batch_received.connect(self.handle_sensor_batch)
         self.sensor_thread.calibration_finished.connect(self.on_calibration_finished)
         self.sensor_thread.start()
 
@@ -204,6 +216,9 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.update_record_button()
 
+        # Started last: its first connection_state_changed needs the log dialog
+        self.modbus_worker.start()
+
     def toggle_recording(self):
 
         """Toggle recording state and start/stop timer"""
@@ -220,7 +235,18 @@ class MainWindow(QtWidgets.QMainWindow):
 
             self.record_timer.start(100)  # Update every 100ms for smooth display
 
-            self.log_message("Recording started", "info")
+            # The reader thread hands its samples to the recorder directly
+            if self.recorder is not None:
+                self.recorder.wait()  # previous recording still finishing its file
+            self.recorder = RecorderThread(file_format=self.recording_format,
+                                           offsets=self.sensor_thread.offsets,
+                                           gains=self.sensor_thread.gains,
+                                           sample_rate=self.plotter.sample_rate,
+                                           sensor_ids=self.sensor_thread.decoder.channels)
+            self.recorder.start()
+            self.sensor_thread.set_recorder(self.recorder)
+
+            self.log_message(f"Recording started: {self.recorder.filename}", "info")
 
         else:
 
@@ -230,6 +256,10 @@ class MainWindow(QtWidgets.QMainWindow):
 
             self.record_timer.stop()
 
+            # Detach first, then let the recorder write its backlog without blocking the GUI
+            self.sensor_thread.set_recorder(None)
+            self.recorder.stop(wait=False)
+
             recording_duration = self.format_time_ms(self.record_elapsed_time)
 
             self.log_message(f"Recording stopped. Duration: {recording_duration}", "done")
@@ -297,6 +327,27 @@ class MainWindow(QtWidgets.QMainWindow):
         self.about_action = QtWidgets.QAction("About", self)
         self.exit_action = QtWidgets.QAction("Exit to OS", self)
 
+        # Smoothing filter applied to incoming samples, switchable at runtime
+        self.filter_menu = QtWidgets.QMenu("Smoothing Filter", self)
+        self.filter_group = QtWidgets.QActionGroup(self)
+        for kind, title in (("none", "Off"), ("moving_average", "Moving Average"),
+                            ("fir_lowpass", "FIR Low-Pass 20 Hz"), ("iir_lowpass", "IIR Low-Pass 20 Hz")):
+            action = QtWidgets.QAction(title, self, checkable=True)
+            action.setChecked(kind == self.plotter.filter_kind)
+            action.triggered.connect(lambda checked, kind=kind: self.plotter.set_filter(kind))
+            self.filter_group.addAction(action)
+            self.filter_menu.addAction(action)
+
+        # File format used by the next recording
+        self.recording_format_menu = QtWidgets.QMenu("Recording Format", self)
+        self.recording_format_group = QtWidgets.QActionGroup(self)
+        for file_format, title in (("csv", "CSV (text)"), ("binary", "Binary (compact)")):
+            action = QtWidgets.QAction(title, self, checkable=True)
+            action.setChecked(file_format == self.recording_format)
+            action.triggered.connect(lambda checked, file_format=file_format: setattr(self, "recording_format", file_format))
+            self.recording_format_group.addAction(action)
+            self.recording_format_menu.addAction(action)
+
         # Connect actions to functions
         self.developer_mode_action.triggered.connect(self.enter_developer_mode)
         self.appearance_action.triggered.connect(self.show_appearance_settings)
@@ -309,7 +360,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.settings_menu.addAction(self.developer_mode_action)
         self.settings_menu.addSeparator()
         self.settings_menu.addAction(self.appearance_action)
+        self.settings_menu.addMenu(self.filter_menu)
         self.settings_menu.addAction(self.data_management_action)
+        self.settings_menu.addMenu(self.recording_format_menu)
         self.settings_menu.addAction(self.system_info_action)
         self.settings_menu.addSeparator()
         self.settings_menu.addAction(self.about_action)
@@ -324,7 +377,7 @@ class MainWindow(QtWidgets.QMainWindow):
                                                   QtWidgets.QLineEdit.Password)
         if ok and text == "raspberry":
             QtWidgets.QMessageBox.information(self, "Developer Mode", "Developer mode activated!")
-            # Add developer mode functionality here
+            self.enable_latency_probe()
         elif ok:
             QtWidgets.QMessageBox.warning(self, "Access Denied", "Incorrect passcode!")
 
@@ -378,13 +431,37 @@ class MainWindow(QtWidgets.QMainWindow):
         if reply == QtWidgets.QMessageBox.Yes:
             self.close()
 
-    def handle_sensor_data(self, sensor_id, value):
-        if sensor_id == 0:
-            self.plotter.receive_data("LVP", value)
-        elif sensor_id == 1:
-            self.plotter.receive_data("AOP", value)
-        elif sensor_id == 2:
-            self.plotter.receive_data("LAP", value)
+    def handle_sensor_batch(self, batch):
+        delivered = time.monotonic()
+        for sensor_id, name in SENSOR_CHANNELS.items():
+            timestamps, values = batch.channel(sensor_id)
+            if len(values):
+                self.plotter.receive_batch(name, values, timestamps)
+
+        if self.latency_probe is not None and batch.stamps is not None:
+            inserted = time.monotonic()
+            self.latency_probe.record_batch(batch.stamps, delivered, inserted)
+            self.plotter.note_inserted(batch.stamps["arrival"], inserted)
+
+    def enable_latency_probe(self):
+        """Starts measuring the serial-to-screen latency and shows it in the log dialog."""
+        if self.latency_probe is not None:
+            return
+        self.latency_probe = LatencyProbe()
+        self.plotter.latency_probe = self.latency_probe
+
+        self.log_text.setGeometry(10, 35, 400, 145)
+        self.latency_label.show()
+        self.latency_timer = QtCore.QTimer()
+        self.latency_timer.timeout.connect(self.update_latency_panel)
+        self.latency_timer.start(1000)
+
+    def update_latency_panel(self):
+        counters = self.sensor_thread.decoder.counters
+        self.latency_label.setText(
+            self.latency_probe.report() +
+            f"\nlink: {counters['samples_dropped']} of {counters['samples_decoded']} samples lost, "
+            f"{counters['bytes_discarded']} bytes discarded")
 
     def calibrate_sensors(self):
         if self.is_start_mode:  # Motor is not running
@@ -404,7 +481,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.is_start_mode:
             # print("TESTING: Start button pressed!")  # Debug
             # start_motor()  # OLD
-            self.modbus.start_motor()  # NEW from ModbusController CLASS
+            self.modbus_worker.start_motor()
             self.ui.resetButton.setText("RESET\nMOTOR")
 
             self.ui.stopButton.setEnabled(True)
@@ -429,7 +506,7 @@ class MainWindow(QtWidgets.QMainWindow):
         # print("TESTING: Stop button pressed!")  # Debug message
         self.disable_controls()
         # stop_motor()  # OLD
-        self.modbus.stop_motor()  # NEW from ModbusController CLASS
+        self.modbus_worker.stop_motor()
         self.ui.resetButton.setEnabled(True)
         self.ui.resetButton.setStyleSheet("background-color: yellow; color: black; font-size: 20px;")
 
@@ -438,7 +515,7 @@ class MainWindow(QtWidgets.QMainWindow):
         # print("TESTING: Reset button pressed!")  # Debug message
         self.enable_controls()
         # reset_motor_position()  # OLD
-        self.modbus.reset_motor_position()  # NEW from ModbusController CLASS
+        self.modbus_worker.reset_motor_position()
 
     def disable_controls(self):  # STILL NOT PROBERLY WORKING
         for widget in [
@@ -513,9 +590,25 @@ class MainWindow(QtWidgets.QMainWindow):
         self.update_motor_parameters()  # Send data to Modbus
 
     def update_motor_parameters(self):
-        # print(f"TESTING: Starting ModbusThread with HR={self.heart_rate}, SV={self.stroke_volume}")  # Debug Message
-        self.modbus_thread = ModbusThread(self.modbus, self.heart_rate, self.stroke_volume)
-        self.modbus_thread.start()
+        # Coalesced by the worker: only the latest HR/SV pair is sent
+        self.modbus_worker.set_motor_parameters(self.heart_rate, self.stroke_volume)
+
+    def on_modbus_command_finished(self, name, latency):
+        if name != "motor_parameters":  # parameter updates are too frequent for the log
+            self.log_message(f"Modbus {name} done ({latency * 1000:.0f} ms)", "done")
+
+    def on_modbus_command_failed(self, name, message):
+        self.log_message(f"Modbus {name} failed: {message}", "error")
+
+    def on_modbus_connection_state(self, state):
+        if state == "connected":
+            self.update_state_indicator("running")
+            self.log_message("Modbus drive connected", "done")
+        elif state == "disconnected":
+            self.update_state_indicator("error")
+            self.log_message("Modbus drive not answering, reconnecting...", "warning")
+        else:
+            self.update_state_indicator("idle")
 
     def update_labels(self):
         """Update displayed values."""
@@ -540,7 +633,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     # ---------------------------------------- Log Window ---------------------------------
 
-    def update_state_indicator(self, state):  # NOT USED
+    def update_state_indicator(self, state):  # Modbus connection state
         color_map = {
             "idle": "gray",
             "running": "green",
@@ -574,6 +667,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log_text.setReadOnly(True)
         self.log_text.setStyleSheet("background-color: transparent; color: #00ffff; font-size: 14px; border: none;")
 
+        # Pipeline latency table, only shown in developer mode
+        self.latency_label = QtWidgets.QLabel(log_container)
+        self.latency_label.setGeometry(10, 185, 400, 125)
+        self.latency_label.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop)
+        self.latency_label.setStyleSheet("background-color: transparent; color: #ffcc66; font-family: monospace; font-size: 12px;")
+        self.latency_label.hide()
+
     def toggle_log_dialog(self, event):
         if self.log_dialog.isVisible():
             self.log_dialog.hide()
@@ -608,7 +708,10 @@ class MainWindow(QtWidgets.QMainWindow):
         # Stop recording if active
         if self.is_recording:
             self.toggle_recording()
+        if self.recorder is not None:
+            self.recorder.wait()
         self.sensor_thread.stop()
+        self.modbus_worker.stop()
         event.accept()
 
 
@@ -0,0 +1,348 @@
+# async_modbus_controller.py – ModbusController variant running on one asyncio event loop thread
+#
+# The serial port is opened non-blocking and watched with loop.add_reader(), so a
+# request in flight costs no thread. Commands from any thread are queued on the loop
+# and sent back to back: RS485 is half-duplex, so one request is on the wire at a
+# time, but the next one goes out as soon as the previous response is complete.
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import serial
+from PyQt5.QtCore import QObject, pyqtSignal
+from pymodbus.factory import ClientDecoder
+from pymodbus.framer.rtu_framer import ModbusRtuFramer
+
+from modbus_controller import CommandPreempted, ModbusOffline, ModbusRegisters, Pause
+from modbus_worker import (MOTION_COMMANDS, PRIORITY_NORMAL, PRIORITY_URGENT, CommandQueue, ConnectionSupervisor,
+                           ModbusCommand)
+
+
+class AsyncCommand(ModbusCommand):
+    """One queued call on the event loop, completed through a concurrent.futures.Future."""
+
+    def __init__(self, name, func, args, key=None, priority=PRIORITY_NORMAL):
+        super().__init__(name, func, args, key, priority)   # func: ModbusRegisters generator function
+        self.future = concurrent.futures.Future()
+
+    def cancel(self):
+        self.future.cancel()
+
+    def retry(self):
+        # The future is already running, so a fresh command completes it
+        retry = AsyncCommand(self.name, self.func, self.args, self.key, self.priority)
+        retry.queued_at = self.queued_at
+        retry.future.add_done_callback(lambda done: self._chain(done, self.future))
+        return retry
+
+    @staticmethod
+    def _chain(source, target):
+        if source.cancelled():
+            target.set_exception(CommandPreempted())
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+
+class AsyncModbusController(ModbusRegisters, QObject):
+    """
+    Same motor methods as ModbusController, without blocking the caller.
+
+    Every public method returns a concurrent.futures.Future right away. Results are
+    also reported through the same signals as ModbusWorker; they are emitted from the
+    loop thread and Qt queues them to the GUI thread, so the GUI can use either class.
+    Each request has its own timeout. The register logic is ModbusRegisters, the
+    queue and the connection supervision are those of ModbusWorker.
+    """
+    command_finished = pyqtSignal(str, float)   # command name, latency from first request to done (s)
+    command_failed = pyqtSignal(str, str)       # command name, error message
+    connection_state_changed = pyqtSignal(str)  # "connected", "reconnecting" or "disconnected"
+
+    def __init__(self, port='/dev/com2', baudrate=115200, unit=1, timeout=1.0, cache_max_age=None,
+                 probe_interval=2.0, min_backoff=0.5, max_backoff=8.0, parent=None):
+        super().__init__(cache_max_age=cache_max_age, unit=unit, parent=parent)
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout              # s per request
+
+        self.supervisor = ConnectionSupervisor(self.connection_state_changed.emit, self._restore_parameters,
+                                               probe_interval, min_backoff, max_backoff)
+        self._last_parameters = None
+
+        self.loop = None
+        self._thread = None
+        self._serial = None
+        self._framer = ModbusRtuFramer(ClientDecoder())
+        self._rx = bytearray()
+        self._expected = 0                  # length of the response frame being waited for
+        self._response = None               # asyncio.Future of the request in flight
+        self._queue = CommandQueue()
+        self._wakeup = None
+        self._preempt = None                # asyncio.Event, set while an urgent command waits
+        self._stopping = False
+        self._ready = None
+
+    @property
+    def connection_state(self):
+        return self.supervisor.state
+
+    # ------------------------------------------------------------------ loop thread
+
+    def start(self):
+        """Starts the event loop thread; the first connect happens there."""
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="AsyncModbus", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._wakeup = asyncio.Event()
+        self._preempt = asyncio.Event()
+        self._connect()
+        self._ready.set()
+        self.loop.run_until_complete(self._run_commands())
+        self._close_serial()
+        self.loop.close()
+
+    def stop(self):
+        """Stops once the commands already queued have been sent."""
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self._request_stop)
+        self._thread.join()
+        self._thread = None
+
+    def _request_stop(self):
+        self._stopping = True
+        self._wakeup.set()
+
+    # ------------------------------------------------------------------ command queue
+
+    def submit(self, name, func, *args, key=None, priority=PRIORITY_NORMAL):
+        """Queues ModbusRegisters generator func(*args) from any thread; a queued command with the same key is replaced."""
+        command = AsyncCommand(name, func, args, key, priority)
+        if self.loop is None:
+            command.future.set_exception(RuntimeError("AsyncModbusController not started."))
+            return command.future
+        self.loop.call_soon_threadsafe(self._enqueue, command)
+        return command.future
+
+    def _enqueue(self, command):
+        if self._queue.put(command):
+            self._preempt.set()
+        self._wakeup.set()
+
+    async def _run_commands(self):
+        next_check = time.monotonic()
+        while True:
+            while not self._queue.pending:
+                if self._stopping:
+                    return
+                timeout = next_check - time.monotonic()
+                if timeout <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            command = self._queue.take()
+            self._preempt.clear()
+
+            if command is None:
+                next_check = time.monotonic() + await self._supervise()
+                continue
+            if not command.future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = await self._drive(command.func(*command.args))
+            except CommandPreempted:
+                self._preempted(command)
+                continue
+            except ModbusOffline as e:
+                print(f"Warning: Modbus offline. {command.name} not sent.")
+                command.future.set_exception(e)
+                self.command_failed.emit(command.name, str(e))
+                continue
+            except Exception as e:
+                print(f"Modbus Error: {e}")
+                command.future.set_exception(e)
+                self.command_failed.emit(command.name, str(e))
+                continue
+            command.future.set_result(result)
+            self.command_finished.emit(command.name, time.monotonic() - command.queued_at)
+
+    def _preempted(self, command):
+        if self._queue.requeue(command):
+            print(f"Modbus: {command.name} pre-empted, queued again")
+            return
+        print(f"Modbus: {command.name} pre-empted")
+        command.future.set_exception(CommandPreempted())
+        self.command_failed.emit(command.name, "pre-empted by an urgent command")
+
+    async def _drive(self, steps):
+        """Runs a ModbusRegisters generator to the end on the loop and returns its result."""
+        try:
+            step = next(steps)
+            while True:
+                if isinstance(step, Pause):
+                    await self._pause(step.seconds)
+                    step = steps.send(None)
+                else:
+                    step = steps.send(await self._transact(step))
+        except StopIteration as done:
+            return done.value
+
+    async def _pause(self, seconds):
+        """asyncio.sleep() that ends early (with CommandPreempted) when something more urgent is queued."""
+        try:
+            await asyncio.wait_for(self._preempt.wait(), seconds)
+        except asyncio.TimeoutError:
+            return
+        raise CommandPreempted()
+
+    # ------------------------------------------------------------------ connection
+
+    async def _supervise(self):
+        """Runs one ConnectionSupervisor check between commands; returns the seconds until the next."""
+        check = self.supervisor.check(self.connected)
+        try:
+            action = next(check)
+            while True:
+                if action == "probe":
+                    result = await self._drive(self._probe())
+                elif action == "connect":
+                    result = self._connect()
+                else:
+                    result = self._close_serial()
+                action = check.send(result)
+        except StopIteration as done:
+            return done.value
+
+    def _restore_parameters(self):
+        if self._last_parameters is not None:
+            # The drive may have restarted; restore the parameters the GUI shows
+            self.set_motor_parameters(*self._last_parameters)
+
+    def _connect(self):
+        """(Re)opens the serial port. The register cache is dropped, the drive may have restarted."""
+        self._close_serial()
+        self.cache.invalidate()
+        try:
+            self._serial = serial.Serial(self.port, self.baudrate, bytesize=8, parity='N', stopbits=1, timeout=0)
+        except (serial.SerialException, OSError) as e:
+            print(f"Warning: Modbus device not found ({e}). Running in offline mode.")
+            self.connected = False
+            return False
+        self.loop.add_reader(self._serial.fileno(), self._on_readable)
+        self.connected = True
+        return True
+
+    def _close_serial(self):
+        if self._serial is not None:
+            try:
+                self.loop.remove_reader(self._serial.fileno())
+            except (ValueError, OSError):
+                pass
+            self._serial.close()
+            self._serial = None
+        self.connected = False
+
+    # ------------------------------------------------------------------ wire
+
+    def _on_readable(self):
+        try:
+            data = self._serial.read(self._serial.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            print(f"Error: {e}")
+            self._close_serial()
+            if self._response is not None and not self._response.done():
+                self._response.set_result(None)
+            return
+        if self._response is None or self._response.done():
+            return      # late answer to a request that already timed out
+        self._rx += data
+
+        # Exception responses are unit + function | 0x80 + code + CRC
+        needed = 5 if len(self._rx) >= 2 and self._rx[1] & 0x80 else self._expected
+        if len(self._rx) >= needed:
+            self._response.set_result(bytes(self._rx[:needed]))
+
+    async def _transact(self, request):
+        """Sends one request and returns the decoded response, or None on timeout / lost port."""
+        if not self.connected:
+            return None
+        if self._preempt.is_set():
+            raise CommandPreempted()
+        request.unit_id = self.unit
+        self._rx.clear()
+        self._framer.resetFrame()
+        self._expected = 1 + request.get_response_pdu_size() + 2   # unit + PDU + CRC
+        self._response = self.loop.create_future()
+        try:
+            self._serial.write(self._framer.buildPacket(request))
+            frame = await asyncio.wait_for(self._response, self.timeout)
+        except asyncio.TimeoutError:
+            print(f"Error: no response to function {request.function_code} within {self.timeout} s")
+            return None
+        except (serial.SerialException, OSError) as e:
+            print(f"Error: {e}")
+            self._close_serial()
+            return None
+        finally:
+            self._response = None
+        if frame is None:
+            return None
+
+        results = []
+        self._framer.processIncomingPacket(frame, results.append, unit=self.unit)
+        if not results:
+            print("Error: corrupt Modbus response (CRC)")
+            return None
+        return results[0]
+
+    # ------------------------------------------------------------------ public API (any thread)
+
+    def write_register(self, address, value, force=False):
+        return self.submit("write_register", self._write_register, address, value, force)
+
+    def write_registers(self, address, values):
+        return self.submit("write_registers", self._write_registers, address, values)
+
+    def write_register_block(self, registers):
+        return self.submit("write_register_block", self._write_register_block, dict(registers))
+
+    def read_register(self, address, max_age=0):
+        return self.submit("read_register", self._read_register, address, max_age)
+
+    def set_motor_speed(self, frequency, hub):
+        return self.submit("motor_speed", self._set_motor_speed, frequency, hub)
+
+    def set_motor_target_position(self, frequency, hub):
+        return self.submit("motor_target_position", self._set_motor_target_position, frequency, hub)
+
+    def set_motor_parameters(self, frequency, hub):
+        """Coalesced: while one update is still queued, a newer one replaces it."""
+        self._last_parameters = (frequency, hub)
+        return self.submit("motor_parameters", self._set_motor_parameters, frequency, hub, key="motor_parameters")
+
+    def start_motor(self):
+        return self.submit("start_motor", self._start_motor)
+
+    def stop_motor(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._queue.discard, MOTION_COMMANDS)
+        return self.submit("stop_motor", self._stop_motor, priority=PRIORITY_URGENT)
+
+    def reset_motor_position(self):
+        return self.submit("reset_motor_position", self._reset_motor_position)
+
+    def close(self):
+        """Closes the Modbus connection cleanly."""
+        self.stop()
+        print("Connection closed.")
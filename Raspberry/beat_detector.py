@@ -0,0 +1,116 @@
+# beat_detector.py – Streaming cardiac cycle segmentation for the pressure channels
+import numpy as np
+
+
+class BeatDetector:
+    """
+    Splits a pressure signal into cardiac cycles as samples arrive.
+
+    A beat starts where the pressure rises through the midpoint between the
+    previous beat's systolic and diastolic value (with hysteresis, so noise on
+    the upstroke does not count twice). When the next upstroke is found the
+    finished cycle is measured once and returned as a dict.
+    """
+
+    def __init__(self, min_amplitude=10.0, min_cycle=0.3, max_cycle=6.5, learn_time=2.0,
+                 hysteresis=0.2, dpdt_span=0.01):
+        self.min_amplitude = min_amplitude  # mmHg, flatter signals are not beating
+        self.min_cycle = min_cycle          # s, refractory period (200 BPM)
+        self.max_cycle = max_cycle          # s, re-learn the threshold after this long without a beat (~9 BPM)
+        self.learn_time = learn_time        # s, first guess of the threshold while none is known
+        self.hysteresis = hysteresis        # fraction of the last amplitude
+        self.dpdt_span = dpdt_span          # s, dP/dt is taken over this span to average out ADC steps
+        self.last_beat_time = None
+        self._threshold = None
+        self._band = 0.0
+        self._armed = False
+        self._start_time = None             # upstroke that opened the current cycle
+        self._segment_start = None
+        self._times = []
+        self._values = []
+
+    def process(self, timestamps, values):
+        """
+        Feeds new samples and returns the beats completed by them.
+
+        Args:
+        - timestamps (np.ndarray): sample times in seconds (time.monotonic())
+        - values (np.ndarray): pressure in mmHg
+
+        Returns:
+        - list: one dict per finished beat with systole, diastole, mean,
+          dpdt_max (mmHg/s), heart_rate (BPM) and time
+        """
+        beats = []
+        for t, value in zip(timestamps.tolist(), values.tolist()):
+            if self._segment_start is None:
+                self._segment_start = t
+
+            if self._threshold is not None:
+                if value < self._threshold - self._band:
+                    self._armed = True
+                elif self._armed and value > self._threshold and \
+                        (self._start_time is None or t - self._start_time >= self.min_cycle):
+                    self._armed = False
+                    beat = self._close_cycle(t)
+                    if beat is not None:
+                        beats.append(beat)
+
+            self._times.append(t)
+            self._values.append(value)
+
+            # No beat for too long (first samples, changed pressure level or pump stopped)
+            limit = self.learn_time if self._threshold is None else self.max_cycle
+            if t - self._segment_start > limit:
+                self._relearn()
+        return beats
+
+    def _close_cycle(self, t):
+        """Measures the samples since the previous upstroke and starts a new cycle at `t`."""
+        beat = None
+        if self._start_time is not None and len(self._values) > 1:
+            values = np.asarray(self._values)
+            times = np.asarray(self._times)
+            duration = t - self._start_time
+            # Per-sample timestamps come from the device clock and are evenly spaced, so one
+            # average spacing turns dpdt_span into a sample count for the slope
+            dt = (times[-1] - times[0]) / (len(values) - 1)
+            span = min(len(values) - 1, max(1, round(self.dpdt_span / dt))) if dt > 0 else 1
+
+            beat = {
+                "systole": float(values.max()),
+                "diastole": float(values.min()),
+                "mean": float(values.mean()),
+                "dpdt_max": float((values[span:] - values[:-span]).max() / (span * dt)) if dt > 0 else 0.0,
+                "heart_rate": 60.0 / duration,
+                "time": t,
+            }
+            self._set_threshold(beat["systole"], beat["diastole"])
+            if self._threshold is None:
+                beat = None     # amplitude collapsed, this was noise and not a beat
+            else:
+                self.last_beat_time = t
+
+        self._start_time = t
+        self._segment_start = t
+        self._times = []
+        self._values = []
+        return beat
+
+    def _relearn(self):
+        """Derives a fresh threshold from the samples of the current segment."""
+        if self._values:
+            self._set_threshold(max(self._values), min(self._values))
+        self._start_time = None
+        self._segment_start = None
+        self._times = []
+        self._values = []
+
+    def _set_threshold(self, high, low):
+        amplitude = high - low
+        if amplitude < self.min_amplitude:
+            self._threshold = None
+            self._armed = False
+            return
+        self._threshold = (high + low) / 2
+        self._band = self.hysteresis * amplitude
@@ -0,0 +1,94 @@
+# bench_calibration.py – Zero offset calibration: compute cost and how long the display goes without data
+# Usage: python benchmarks/bench_calibration.py [sample_rate]
+
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from offset_calibration import OffsetCalibration
+from sensor_reader_thread import SensorReaderThread
+from virtual_nano import VirtualNano
+
+NUM_SAMPLES = 2000
+CHUNK_SETS = 40     # sample sets per read at ~1000 sets/s and a 5 ms read timeout (plus slack)
+
+
+def make_chunks(num_chunks):
+    rng = np.random.default_rng(0)
+    sensor_ids = np.tile(np.arange(3, dtype=np.uint8), CHUNK_SETS)
+    return [(sensor_ids, np.round(120 + rng.normal(0, 2, len(sensor_ids))).astype(np.uint16))
+            for _ in range(num_chunks)]
+
+
+def legacy_offsets(chunks):
+    """The per-sensor list collection and Counter.most_common of the former _perform_calibration()."""
+    sample_data = {0: [], 1: [], 2: []}
+    for sensor_ids, raw in chunks:
+        for sid in (0, 1, 2):
+            missing = NUM_SAMPLES - len(sample_data[sid])
+            if missing > 0:
+                sample_data[sid].extend(raw[sensor_ids == sid][:missing].tolist())
+    return [Counter(samples).most_common(1)[0][0] for samples in sample_data.values()]
+
+
+def histogram_offsets(chunks):
+    calibration = OffsetCalibration(NUM_SAMPLES)
+    for sensor_ids, raw in chunks:
+        if calibration.add(sensor_ids, raw):
+            break
+    return [stats["mode"] for stats in calibration.result()]
+
+
+def _cpu_ms(func, *args, repeat=20):
+    started = time.process_time()
+    for _ in range(repeat):
+        func(*args)
+    return (time.process_time() - started) / repeat * 1000
+
+
+def _live(sample_rate):
+    """Calibration time and the longest gap between SampleBatches while it ran."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    nano = VirtualNano(sample_rate=sample_rate).start()
+    reader = SensorReaderThread(port=nano.port)
+    batches, finished = [], []
+    reader.batch_received.connect(lambda batch: batches.append(time.monotonic()))
+    reader.calibration_finished.connect(lambda offsets: finished.append(time.monotonic()))
+    reader.start()
+
+    time.sleep(0.3)
+    requested = time.monotonic()
+    reader.request_calibration.emit()
+    while not finished and time.monotonic() - requested < 15:
+        app.processEvents()
+        time.sleep(0.002)
+    reader.stop()
+    nano.close()
+
+    during = np.array([requested] + [t for t in batches if requested < t < finished[0]] + [finished[0]])
+    return finished[0] - requested, float(np.diff(during).max())
+
+
+def run(sample_rate=1000.0):
+    """CPU cost of computing the offsets, and calibration time / longest display gap against a VirtualNano."""
+    chunks = make_chunks(NUM_SAMPLES // CHUNK_SETS + 1)
+    assert legacy_offsets(chunks) == histogram_offsets(chunks)
+    duration, gap = _live(sample_rate)
+    return {
+        "legacy_cpu_ms": _cpu_ms(legacy_offsets, chunks),
+        "histogram_cpu_ms": _cpu_ms(histogram_offsets, chunks),
+        "minimum_s": NUM_SAMPLES / sample_rate,
+        "calibration_s": duration,
+        "max_batch_gap_ms": gap * 1000,
+    }
+
+
+if __name__ == "__main__":
+    sample_rate = float(sys.argv[1]) if len(sys.argv) > 1 else 1000.0
+    for key, value in run(sample_rate).items():
+        print(f"{key:20s} {value:,.3f}")
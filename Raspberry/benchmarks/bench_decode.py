@@ -0,0 +1,77 @@
+# bench_decode.py – Bitpacked decode throughput: legacy per-byte loop vs. BitpackedDecoder
+# Usage: python benchmarks/bench_decode.py [seconds_of_data]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_decoder import BitpackedDecoder, encode_bitpacked
+
+CHUNK_SIZE = 256    # typical amount pending per read at 115200 baud
+
+
+def make_stream(num_samples):
+    """Interleaved sensor 0, 1, 2 samples encoded like the Nano sends them."""
+    sensor_ids = np.tile(np.arange(3, dtype=np.uint8), num_samples // 3)
+    raw = np.random.default_rng(0).integers(0, 1024, len(sensor_ids))
+    return encode_bitpacked(sensor_ids, raw)
+
+
+def legacy_decode(stream, emit):
+    """The original byte-by-byte loop from SensorReaderThread.run()."""
+    partial_data = {i: {'low': None, 'high': None} for i in range(3)}
+    for byte in stream:
+        flag = byte & 0b00000001
+        sensor_id = (byte >> 1) & 0b00000011
+        pressure_bits = (byte >> 3) & 0b00011111
+
+        if flag == 0:
+            partial_data[sensor_id]['low'] = pressure_bits
+        else:
+            partial_data[sensor_id]['high'] = pressure_bits
+
+        if partial_data[sensor_id]['low'] is not None and partial_data[sensor_id]['high'] is not None:
+            emit(sensor_id, (partial_data[sensor_id]['high'] << 5) | partial_data[sensor_id]['low'])
+            partial_data[sensor_id]['low'] = None
+            partial_data[sensor_id]['high'] = None
+
+
+def vectorized_decode(stream, chunk_size=CHUNK_SIZE):
+    decoder = BitpackedDecoder()
+    count = 0
+    for start in range(0, len(stream), chunk_size):
+        sensor_ids, raw = decoder.decode(stream[start:start + chunk_size])
+        count += len(raw)
+    return count
+
+
+def _cpu_time(func, *args):
+    started = time.process_time()
+    func(*args)
+    return time.process_time() - started
+
+
+def run(seconds_of_data=10.0):
+    """Returns bytes/s per core for both decoders on `seconds_of_data` worth of 115200-baud input."""
+    num_bytes = int(seconds_of_data * 115200 / 10)
+    stream = make_stream(num_bytes // 2)
+
+    legacy_s = _cpu_time(legacy_decode, stream, lambda sensor_id, value: None)
+    results = {
+        "stream_bytes": len(stream),
+        "legacy_bytes_per_s": len(stream) / legacy_s,
+    }
+    for chunk_size in (64, CHUNK_SIZE, 4096):
+        vector_s = _cpu_time(vectorized_decode, stream, chunk_size)
+        results[f"vectorized_{chunk_size}_bytes_per_s"] = len(stream) / vector_s
+    results["speedup"] = results[f"vectorized_{CHUNK_SIZE}_bytes_per_s"] / results["legacy_bytes_per_s"]
+    return results
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    for key, value in run(seconds).items():
+        print(f"{key:32s} {value:,.1f}")
@@ -0,0 +1,54 @@
+# bench_ingest.py – SensorReaderThread throughput against VirtualNano at increasing sample rates
+# Usage: python benchmarks/bench_ingest.py [seconds_per_rate]
+
+import os
+import sys
+import time
+
+from PyQt5.QtCore import Qt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sensor_reader_thread import SensorReaderThread
+from virtual_nano import VirtualNano
+
+
+def _measure(sample_rate, seconds, byte_loss, corruption):
+    nano = VirtualNano(sample_rate=sample_rate, byte_loss=byte_loss, corruption=corruption, seed=1)
+    thread = SensorReaderThread(port=nano.port)
+    received = []
+    # DirectConnection: the slot runs in the reader thread, no Qt event loop needed
+    thread.batch_received.connect(lambda batch: received.append(len(batch)), Qt.DirectConnection)
+    thread.start()
+    time.sleep(0.2)
+
+    nano.start()
+    cpu_started, wall_started = time.process_time(), time.monotonic()
+    time.sleep(seconds)
+    nano.stop()
+    elapsed = time.monotonic() - wall_started
+    cpu = time.process_time() - cpu_started
+    time.sleep(0.1)     # let the reader catch up with what was written
+    thread.stop()
+    nano.close()
+
+    samples = sum(received)
+    return {
+        "sent_samples_per_s": nano.sets_sent * 3 / elapsed,
+        "received_samples_per_s": samples / elapsed,
+        "delivered_percent": 100.0 * samples / max(1, nano.sets_sent * 3),
+        "cpu_percent": 100.0 * cpu / elapsed,   # reader + generator, both in this process
+        "detected_lost_percent": 100.0 * thread.decoder.samples_dropped / max(1, nano.sets_sent * 3),
+    }
+
+
+def run(rates=(1000, 5000, 20000, 50000), seconds=2.0, byte_loss=0.0, corruption=0.0):
+    """Delivered sample rate and CPU share of reader plus generator per sample-set rate."""
+    return {rate: _measure(rate, seconds, byte_loss, corruption) for rate in rates}
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    for label, loss in (("clean", 0.0), ("1% byte loss", 0.01)):
+        print(f"-- {label}")
+        for rate, result in run(seconds=seconds, byte_loss=loss).items():
+            print(f"{rate:>6} sets/s  " + "  ".join(f"{key} {value:,.1f}" for key, value in result.items()))
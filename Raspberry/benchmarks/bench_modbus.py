@@ -0,0 +1,72 @@
+# bench_modbus.py – Modbus round trip times against DriveSimulator (blocking and asyncio controllers)
+# Usage: python benchmarks/bench_modbus.py [drive_latency_s]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from async_modbus_controller import AsyncModbusController
+from drive_simulator import DriveSimulator
+from modbus_controller import ModbusController
+
+
+def _stats(prefix, seconds):
+    seconds = np.array(seconds) * 1000
+    return {
+        f"{prefix}_p50_ms": float(np.percentile(seconds, 50)),
+        f"{prefix}_p99_ms": float(np.percentile(seconds, 99)),
+    }
+
+
+def _timed(func, count):
+    times = []
+    for _ in range(count):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def run(latency=0.001, count=100):
+    """RTT of single reads/writes and a parameter update, plus how many reads/s each controller sustains."""
+    result = {"drive_latency_ms": latency * 1000}
+    simulator = DriveSimulator(latency=latency).start()
+
+    modbus = ModbusController(port=simulator.port)
+    result.update(_stats("sync_read", _timed(lambda: modbus.read_register(0x621A), count)))
+    result.update(_stats("sync_write", _timed(lambda: modbus.write_register(0x621A, 1234, force=True), count)))
+    speeds = iter(range(10, 10 + count))
+    result.update(_stats("sync_parameters", _timed(
+        lambda: modbus.set_motor_parameters(next(speeds), 1.5), count)))
+    started = time.perf_counter()
+    for _ in range(count):
+        modbus.read_register(0x621A)
+    result["sync_reads_per_s"] = count / (time.perf_counter() - started)
+    modbus.close()
+
+    controller = AsyncModbusController(port=simulator.port, probe_interval=3600)
+    controller.start()
+    while not controller.connected:
+        time.sleep(0.01)
+    result.update(_stats("async_read", _timed(lambda: controller.read_register(0x621A).result(), count)))
+    result.update(_stats("async_write", _timed(
+        lambda: controller.write_register(0x621A, 1234, force=True).result(), count)))
+    # Pipelined: every request is submitted at once, the loop sends them back to back
+    started = time.perf_counter()
+    futures = [controller.read_register(0x621A) for _ in range(count)]
+    for future in futures:
+        future.result()
+    result["async_reads_per_s"] = count / (time.perf_counter() - started)
+    controller.close()
+
+    simulator.close()
+    return result
+
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.001
+    for key, value in run(latency).items():
+        print(f"{key:24s} {value:,.2f}")
@@ -0,0 +1,79 @@
+# bench_plotter.py – LivePlotter cost per 50 ms frame at different plot window sizes (offscreen Qt)
+# Usage: python benchmarks/bench_plotter.py [frames]
+
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from live_plotter import LivePlotter
+from virtual_nano import cardiac_waveforms
+
+CHANNELS = ("LVP", "AOP", "LAP")
+
+
+def _measure(app, window_size, frames, sample_rate, frame_interval):
+    plotter = LivePlotter(window_size=window_size, sample_rate=sample_rate)
+    plotter.timer.stop()    # frames are driven by hand
+    plotter.resize(700, 430)
+    plotter.show()
+    app.processEvents()
+
+    per_frame = int(sample_rate * frame_interval)
+    t = np.arange(per_frame * (frames + 1)) / sample_rate
+    waves = cardiac_waveforms(t)
+    times = {"receive_data": [], "receive_batch": [], "update_curve": [], "repaint": []}
+
+    for frame in range(frames):
+        chunk = slice(frame * per_frame, (frame + 1) * per_frame)
+
+        # Old path: one call per sample (first channel only, the others use receive_batch)
+        started = time.perf_counter()
+        for value in waves[0, chunk].tolist():
+            plotter.receive_data("LVP", value)
+        times["receive_data"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for sensor_id, name in enumerate(CHANNELS[1:], start=1):
+            plotter.receive_batch(name, waves[sensor_id, chunk], t[chunk])
+        times["receive_batch"].append((time.perf_counter() - started) / 2)
+
+        started = time.perf_counter()
+        plotter.refresh_plot()
+        times["update_curve"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        plotter.repaint()   # synchronous paint of all curves
+        times["repaint"].append(time.perf_counter() - started)
+
+    plotter.close()
+    plotter.deleteLater()
+    app.processEvents()
+
+    result = {}
+    for key, values in times.items():
+        values = np.array(values[5:]) * 1000   # skip warm-up frames
+        result[f"{key}_mean_ms"] = float(values.mean())
+        result[f"{key}_p99_ms"] = float(np.percentile(values, 99))
+    return result
+
+
+def run(window_sizes=(200, 1000, 5000, 20000), frames=100, sample_rate=1000.0, frame_interval=0.05):
+    """
+    Per-frame cost of feeding one 50 ms frame of samples and redrawing.
+
+    receive_data / receive_batch are per channel, update_curve and repaint cover all channels.
+    """
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    return {size: _measure(app, size, frames, sample_rate, frame_interval) for size in window_sizes}
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    for size, result in run(frames=frames).items():
+        print(f"window {size:>6}  " + "  ".join(f"{key} {value:.3f}" for key, value in result.items()))
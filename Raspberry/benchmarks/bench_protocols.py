@@ -0,0 +1,53 @@
+# bench_protocols.py – Wire efficiency and decode cost of every format in frame_decoder.DECODERS
+# Usage: python benchmarks/bench_protocols.py [sample_sets]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_decoder import DECODERS, ENCODERS, create_decoder
+
+BAUDRATE = 115200
+CHUNK_SIZE = 256    # typical amount pending per read at 115200 baud
+
+# Decoder options matching what each firmware sends
+PARAMS = {
+    "voltage_lines": {"sensor_ids": (0,)},
+}
+
+
+def make_samples(sample_sets, set_ids):
+    """Samples of sample_sets sets, one per entry of set_ids (the decoder's sensor_ids) each."""
+    sensor_ids = np.tile(np.asarray(set_ids, dtype=np.uint8), sample_sets)
+    raw = np.random.default_rng(0).integers(0, 1024, len(sensor_ids))
+    return sensor_ids, raw
+
+
+def run(sample_sets=20000):
+    """Per format: bytes per sample, the sample rate 115200 baud can carry, and decoded samples/s per core."""
+    results = {}
+    for kind in DECODERS:
+        decoder = create_decoder(kind, **PARAMS.get(kind, {}))
+        num_sensors = len(decoder.sensor_ids)
+        stream = ENCODERS[kind](*make_samples(sample_sets, decoder.sensor_ids))
+        bytes_per_sample = len(stream) / (sample_sets * num_sensors)
+
+        started = time.process_time()
+        decoded = 0
+        for start in range(0, len(stream), CHUNK_SIZE):
+            decoded += len(decoder.decode(stream[start:start + CHUNK_SIZE])[1])
+        cpu_s = time.process_time() - started
+
+        results[f"{kind}_bytes_per_sample"] = bytes_per_sample
+        results[f"{kind}_max_samples_per_s"] = BAUDRATE / decoder.bits_per_byte / bytes_per_sample
+        results[f"{kind}_decode_samples_per_s"] = decoded / cpu_s
+    return results
+
+
+if __name__ == "__main__":
+    sample_sets = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for key, value in run(sample_sets).items():
+        print(f"{key:36s} {value:,.1f}")
@@ -0,0 +1,70 @@
+# bench_reader_latency.py – Idle CPU and sample latency of SensorReaderThread on a pseudo-terminal
+# Usage: python benchmarks/bench_reader_latency.py [read_timeout_s]
+
+import os
+import sys
+import time
+import tty
+
+import numpy as np
+from PyQt5.QtCore import Qt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_decoder import encode_bitpacked
+from sensor_reader_thread import SensorReaderThread
+
+
+def _open_pty():
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    return master, os.ttyname(slave)
+
+
+def run(read_timeout=0.005, idle_seconds=2.0, num_frames=200, frame_interval=0.02):
+    """
+    Measures the CPU share of the reader thread while nothing is sent, then the time
+    from writing one frame (3 samples) to the pty until its SampleBatch is emitted.
+    """
+    master, port = _open_pty()
+    thread = SensorReaderThread(port=port, read_timeout=read_timeout)
+    arrivals = []
+    # DirectConnection: the slot runs in the reader thread, no Qt event loop needed
+    thread.batch_received.connect(lambda batch: arrivals.append(time.monotonic()), Qt.DirectConnection)
+    thread.start()
+    time.sleep(0.2)
+
+    # Idle: the main thread only sleeps, so process CPU time is the reader's
+    cpu_started, wall_started = time.process_time(), time.monotonic()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_started) / (time.monotonic() - wall_started)
+
+    frame = encode_bitpacked([0, 1, 2], [512, 512, 512])
+    latencies = []
+    for _ in range(num_frames):
+        arrivals.clear()
+        sent = time.monotonic()
+        os.write(master, frame)
+        time.sleep(frame_interval)
+        if arrivals:
+            latencies.append(arrivals[0] - sent)
+
+    thread.stop()
+    os.close(master)
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "read_timeout_ms": read_timeout * 1000,
+        "emit_interval_ms": thread.emit_interval * 1000,
+        "idle_cpu_percent": idle_cpu * 100,
+        "frames_delivered": len(latencies),
+        "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else float("nan"),
+        "latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else float("nan"),
+        "latency_max_ms": float(latencies.max()) if len(latencies) else float("nan"),
+    }
+
+
+if __name__ == "__main__":
+    timeout = float(sys.argv[1]) if len(sys.argv) > 1 else 0.005
+    for key, value in run(timeout).items():
+        print(f"{key:20s} {value:,.2f}")
@@ -0,0 +1,85 @@
+# bench_recorder.py – Sustained rows/s of the original one-line-per-row loop vs. batched RecorderThread
+#                     (CSV and binary), plus file size and reload time of each format
+# Usage: python benchmarks/bench_recorder.py [target_directory]   (e.g. a folder on the SD card)
+
+import os
+import queue
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data_recorder import RecorderThread
+from recording_format import load_recording
+
+
+def legacy_record(filename, items):
+    """The original RecorderThread.run() loop, fed from a pre-filled queue."""
+    q = queue.Queue()
+    for item in items:
+        q.put(item)
+    latest_values = {0: None, 1: None, 2: None}
+    with open(filename, "w") as file:
+        file.write("timestamp,LVP,AOP,LAP\n")
+        while not q.empty():
+            sensor_id, value = q.get(timeout=0.1)
+            latest_values[sensor_id] = value
+            if all(v is not None for v in latest_values.values()):
+                timestamp = time.time()
+                file.write(f"{timestamp:.3f},{latest_values[0]:.2f},{latest_values[1]:.2f},{latest_values[2]:.2f}\n")
+                latest_values = {0: None, 1: None, 2: None}
+
+
+def batched_record(filename, items, file_format="csv", read_size=30):
+    """Feeds the samples the way SensorReaderThread does: one write_batch() per serial read."""
+    recorder = RecorderThread(filename, file_format=file_format, flush_interval=1.0, fsync_interval=10.0)
+    sensor_ids = np.array([item[0] for item in items], dtype=np.uint8)
+    values = np.array([item[1] for item in items])
+    raw = np.round(values / 0.4).astype(np.uint16)
+    timestamps = time.monotonic() + np.arange(len(items)) / 3000
+    for start in range(0, len(items), read_size):
+        end = start + read_size
+        recorder.write_batch(sensor_ids[start:end], raw[start:end], values[start:end], timestamps[start:end])
+    recorder.start()
+    recorder.stop()
+    return recorder.rows_written
+
+
+def run(directory=None, num_rows=200000):
+    """Returns rows/s for both recorders when writing `num_rows` rows into `directory`."""
+    items = [(i % 3, 80.0 + (i % 97) * 0.37) for i in range(3 * num_rows)]
+    results = {"rows": num_rows}
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        recorders = (
+            ("legacy", legacy_record, "legacy.csv"),
+            ("batched", batched_record, "batched.csv"),
+            ("binary", lambda filename, items: batched_record(filename, items, "binary"), "batched.mlrec"),
+        )
+        for name, func, basename in recorders:
+            filename = os.path.join(tmp, basename)
+            started = time.perf_counter()
+            func(filename, items)
+            elapsed = time.perf_counter() - started
+            results[f"{name}_rows_per_s"] = num_rows / elapsed
+            results[f"{name}_bytes_per_row"] = os.path.getsize(filename) / num_rows
+
+        # Reload into (n, 3) mmHg arrays
+        started = time.perf_counter()
+        np.loadtxt(os.path.join(tmp, "batched.csv"), delimiter=",", skiprows=1)
+        results["csv_load_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        recording = load_recording(os.path.join(tmp, "batched.mlrec"))
+        recording.timestamps, recording.pressures()
+        results["binary_load_s"] = time.perf_counter() - started
+        del recording
+
+    results["speedup"] = results["batched_rows_per_s"] / results["legacy_rows_per_s"]
+    return results
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else None
+    for key, value in run(target).items():
+        print(f"{key:24s} {value:,.3f}")
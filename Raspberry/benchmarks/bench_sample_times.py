@@ -0,0 +1,63 @@
+# bench_sample_times.py – Sample time error of arrival-based timestamps versus the Nano's own clock
+# Usage: python benchmarks/bench_sample_times.py [seconds]
+
+import os
+import sys
+import time
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sensor_reader_thread import SensorReaderThread
+from virtual_nano import VirtualNano
+
+SAMPLE_RATE = 2000.0
+CLOCK_DRIFT = 500.0     # ppm, a typical ceramic resonator
+WARMUP = 1.0            # s left out while the clock fit settles
+
+
+def _measure(app, seconds, timestamps):
+    nano = VirtualNano(sample_rate=SAMPLE_RATE, protocol="packed", timestamps=timestamps,
+                       clock_drift=CLOCK_DRIFT).start()
+    reader = SensorReaderThread(port=nano.port, protocol="packed",
+                                protocol_params={"timestamps": timestamps})
+    times = []
+    reader.batch_received.connect(lambda batch: times.append(batch.channel(0)[0]))
+    reader.start()
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    reader.stop()
+    app.processEvents()
+    nano.close()
+
+    # No bytes are lost on a pty, so sample k of sensor 0 is set k
+    measured = np.concatenate(times)
+    error = measured - nano.host_times(0, len(measured))
+    error = error[int(WARMUP * SAMPLE_RATE):]
+    jitter = error - np.median(error)
+    return {
+        "latency_ms": float(np.median(error)) * 1000,
+        "jitter_std_us": float(jitter.std()) * 1e6,
+        "jitter_p99_us": float(np.percentile(np.abs(jitter), 99)) * 1e6,
+        "drift_ppm": reader.device_clock.drift_ppm if timestamps else 0.0,
+    }
+
+
+def run(seconds=5.0):
+    """Error of the per-sample timestamps against the true sample times, without and with device stamps."""
+    app = QCoreApplication.instance() or QCoreApplication([])
+    result = {"clock_drift_ppm": CLOCK_DRIFT}
+    for label, timestamps in (("arrival", False), ("device", True)):
+        for key, value in _measure(app, seconds, timestamps).items():
+            result[f"{label}_{key}"] = value
+    return result
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    for key, value in run(seconds).items():
+        print(f"{key:28s} {value:,.2f}")
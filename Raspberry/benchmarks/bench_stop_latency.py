@@ -0,0 +1,71 @@
+# bench_stop_latency.py – Time from stop_motor() until the E-Stop write reaches a simulated drive
+# Usage: python benchmarks/bench_stop_latency.py [drive_latency_s]
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from drive_simulator import CONTROL_WORD, ESTOP, DriveSimulator
+from modbus_controller import ModbusController
+from modbus_worker import ModbusWorker
+
+
+def _estop_times(simulator):
+    return [t for t, address, value in simulator.write_log if address == CONTROL_WORD and value == ESTOP]
+
+
+def _measure(priority, trials, latency, seed):
+    simulator = DriveSimulator(latency=latency).start()
+    modbus = ModbusController(port=simulator.port)
+    worker = ModbusWorker(modbus, probe_interval=3600)
+    worker.start()
+    rng = random.Random(seed)
+
+    latencies = []
+    for trial in range(trials):
+        # Busy bus: a homing sequence followed by a long-press stream of parameter updates
+        worker.reset_motor_position()
+        for step in range(10):
+            worker.set_motor_parameters(60 + (trial + step) % 60, 1.5)
+        time.sleep(rng.uniform(0, 1.2))
+
+        count = len(_estop_times(simulator))
+        requested = time.monotonic()
+        if priority:
+            worker.stop_motor()
+        else:
+            # The old behaviour: stop waits in line like any other command
+            worker.submit("stop_motor", modbus.stop_motor)
+        while len(_estop_times(simulator)) == count:
+            time.sleep(0.0005)
+        latencies.append(_estop_times(simulator)[count] - requested)
+
+        # Let the queue drain so every trial starts from the same state
+        while worker._queue.pending:
+            time.sleep(0.01)
+        time.sleep(0.05)
+
+    worker.stop()
+    modbus.close()
+    simulator.close()
+    return np.array(latencies) * 1000
+
+
+def run(latency=0.005, trials=20, seed=1):
+    """Worst-case and typical E-Stop latency with FIFO ordering versus the priority lane."""
+    result = {"drive_latency_ms": latency * 1000}
+    for label, priority in (("fifo", False), ("priority", True)):
+        latencies = _measure(priority, trials, latency, seed)
+        result[f"{label}_p50_ms"] = float(np.percentile(latencies, 50))
+        result[f"{label}_max_ms"] = float(latencies.max())
+    return result
+
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.005
+    for key, value in run(latency).items():
+        print(f"{key:24s} {value:,.2f}")
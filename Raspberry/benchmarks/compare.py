@@ -0,0 +1,41 @@
+# compare.py – Side-by-side view of two run_all.py result files
+# Usage: python benchmarks/compare.py old.json new.json
+
+import json
+import sys
+
+
+def flatten(results, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numbers only."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(old, new):
+    """Returns (metric, old, new, new/old) for every metric present in both reports."""
+    old_flat, new_flat = flatten(old["results"]), flatten(new["results"])
+    rows = []
+    for name in old_flat:
+        if name in new_flat:
+            ratio = new_flat[name] / old_flat[name] if old_flat[name] else float("nan")
+            rows.append((name, old_flat[name], new_flat[name], ratio))
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python benchmarks/compare.py old.json new.json")
+    with open(sys.argv[1]) as file:
+        old = json.load(file)
+    with open(sys.argv[2]) as file:
+        new = json.load(file)
+
+    print(f"{'metric':56s}{old['commit']:>18s}{new['commit']:>18s}{'ratio':>8s}")
+    for name, old_value, new_value, ratio in compare(old, new):
+        print(f"{name:56s}{old_value:18,.3f}{new_value:18,.3f}{ratio:8.2f}")
@@ -0,0 +1,86 @@
+# run_all.py – Runs the benchmarks headless and saves the results as JSON for comparison across commits
+# Usage: python benchmarks/run_all.py [benchmark ...]     (default: all; see BENCHMARKS)
+# Compare two runs with: python benchmarks/compare.py old.json new.json
+
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import bench_calibration
+import bench_decode
+import bench_ingest
+import bench_modbus
+import bench_plotter
+import bench_protocols
+import bench_reader_latency
+import bench_recorder
+import bench_sample_times
+import bench_stop_latency
+
+# name -> run() with the arguments used for the saved results
+BENCHMARKS = {
+    "decode": lambda: bench_decode.run(),
+    "protocols": lambda: bench_protocols.run(),
+    "reader_latency": lambda: bench_reader_latency.run(),
+    "ingest": lambda: bench_ingest.run(seconds=2.0),
+    "plotter": lambda: bench_plotter.run(),
+    "recorder": lambda: bench_recorder.run(),
+    "modbus": lambda: bench_modbus.run(),
+    "stop_latency": lambda: bench_stop_latency.run(trials=10),
+    "sample_times": lambda: bench_sample_times.run(),
+    "calibration": lambda: bench_calibration.run(),
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(names=None):
+    """Runs the selected benchmarks (all by default) and returns the results with run metadata."""
+    report = {
+        "commit": _git_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": {},
+    }
+    for name in names or BENCHMARKS:
+        print(f"[run_all] {name} ...", flush=True)
+        started = time.monotonic()
+        # The controllers and the recorder log every transaction, keep the console readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            report["results"][name] = BENCHMARKS[name]()
+        print(f"[run_all] {name} done in {time.monotonic() - started:.1f} s", flush=True)
+    return report
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        sys.exit(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+
+    report = run(names)
+    directory = os.path.join(HERE, "results")
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{report['commit']}.json")
+    with open(filename, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"[run_all] Results saved to {filename}")
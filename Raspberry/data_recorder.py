@@ -1,45 +1,149 @@
-
-# RecorderThread.py 
-# logs pressure data to CSV: timestamp, LVP, AOP, LAP
+# RecorderThread.py
+# logs pressure data rows: timestamp, LVP, AOP, LAP (CSV in mmHg or binary raw counts, see recording_format.py)
+# Only the sensors the firmware sends get a column, see ChunkDecoder.channels
 
 from PyQt5.QtCore import QThread
+import numpy as np
 import queue
 import time
 
+from recording_format import CHANNELS, WRITERS
+
+
+class OffsetChange:
+    """Queued between sample batches when the zero offsets changed (calibration during a recording)."""
+
+    def __init__(self, offsets):
+        self.offsets = offsets
+
+
 class RecorderThread(QThread):
-    def __init__(self, filename=None, parent=None):
+    def __init__(self, filename=None, file_format="csv", offsets=(0, 0, 0), gains=(1, 1, 1), sample_rate=None,
+                 sensor_ids=(0, 1, 2), flush_interval=1.0, fsync_interval=10.0, max_batch=10000, parent=None):
         super().__init__(parent)
-        self.queue = queue.Queue()
+        self.queue = queue.SimpleQueue()    # C implementation, far cheaper per item than Queue
         self.running = True
-        self.filename = filename or f"recording_{int(time.time())}.csv"
-        self.file = None
-        self.latest_values = {0: None, 1: None, 2: None}
+        self.file_format = file_format
+        self.filename = filename or f"recording_{int(time.time())}{WRITERS[file_format].extension}"
+        self.writer = None
+
+        # One column per recorded sensor; a row is written once each of them has reported
+        self.sensor_ids = tuple(sensor_ids)
+        self._columns = {sensor_id: column for column, sensor_id in enumerate(self.sensor_ids)}
+        self.latest_values = [None] * len(self.sensor_ids)
+        self.latest_raw = [None] * len(self.sensor_ids)
         self.last_write_time = 0
 
+        # Calibration at recording start (indexed by sensor_id), stored in the binary header;
+        # later calibrations are recorded as offset changes (see write_batch)
+        self.offsets = offsets
+        self._offsets_in_use = offsets
+        self.gains = gains
+        self.sample_rate = sample_rate
+
+        # Samples carry time.monotonic() stamps from the reader; rows are written as epoch time
+        self.clock_offset = time.time() - time.monotonic()
+
+        # Rows are written in blocks; the OS buffer is flushed every flush_interval
+        # seconds and forced to the SD card every fsync_interval seconds (None = never)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.rows_written = 0
+
     def run(self):
-        self.file = open(self.filename, "w")
-        self.file.write("timestamp,LVP,AOP,LAP\n")
+        self.writer = WRITERS[self.file_format](
+            self.filename, start_time=time.time(), channels=[CHANNELS[sensor_id] for sensor_id in self.sensor_ids],
+            offsets=[self.offsets[sensor_id] for sensor_id in self.sensor_ids],
+            gains=[self.gains[sensor_id] for sensor_id in self.sensor_ids], sample_rate=self.sample_rate)
+        last_flush = last_fsync = time.monotonic()
 
         while self.running or not self.queue.empty():
-            try:
-                sensor_id, value = self.queue.get(timeout=0.1)
-                self.latest_values[sensor_id] = value
-
-                if all(v is not None for v in self.latest_values.values()):
-                    timestamp = time.time()
-                    lvp = self.latest_values[0]
-                    aop = self.latest_values[1]
-                    lap = self.latest_values[2]
-                    self.file.write(f"{timestamp:.3f},{lvp:.2f},{aop:.2f},{lap:.2f}\n")
-                    self.latest_values = {0: None, 1: None, 2: None}
-            except queue.Empty:
+            batch = self._drain()
+            if batch:
+                self._write_rows(batch)
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_interval:
+                self.writer.flush()
+                last_flush = now
+            if self.fsync_interval is not None and now - last_fsync >= self.fsync_interval:
+                self.writer.flush(sync=True)
+                last_fsync = now
+
+        self.writer.close()
+
+    def _drain(self):
+        """Waits up to 100 ms for the first item, then takes everything else already queued."""
+        try:
+            batch = [self.queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        try:
+            while len(batch) < self.max_batch:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_rows(self, batch):
+        """Pairs the queued samples into rows of the recorded sensors and writes them as one block."""
+        times, values, raws = [], [], []
+        latest = self.latest_values
+        latest_raw = self.latest_raw
+        columns = self._columns
+        changes = []
+        for item in batch:
+            if isinstance(item, OffsetChange):
+                # Start a fresh row, so no row mixes samples of both calibrations
+                changes.append((self.rows_written + len(times), item.offsets))
+                latest[:] = [None] * len(latest)
                 continue
+            sensor_ids, raw, pressures, timestamps = item
+            for sensor_id, counts, value, timestamp in zip(sensor_ids.tolist(), raw.tolist(),
+                                                           pressures.tolist(), timestamps.tolist()):
+                column = columns.get(sensor_id)
+                if column is None:
+                    continue
+                latest[column] = value
+                latest_raw[column] = counts
+                if None not in latest:
+                    # Row time is the acquisition time of its last sample
+                    times.append(timestamp)
+                    values.extend(latest)
+                    raws.extend(latest_raw)
+                    latest[:] = [None] * len(latest)
+
+        if times:
+            width = len(self.sensor_ids)
+            self.writer.write_rows(np.array(times) + self.clock_offset,
+                                   np.array(values).reshape(-1, width),
+                                   np.array(raws, dtype=np.uint16).reshape(-1, width))
+            self.rows_written += len(times)
+            self.last_write_time = time.time()
+        for record_index, offsets in changes:
+            self.writer.set_offsets(record_index, [offsets[sensor_id] for sensor_id in self.sensor_ids])
+
+    def write_batch(self, sensor_ids, raw, values, timestamps, offsets=None):
+        """
+        Queues the samples of one read (arrays); called from SensorReaderThread.
 
-        self.file.close()
+        Args:
+        - offsets (array): zero offsets (by sensor_id) the values were computed with. The
+          reader swaps in a new array when a calibration finishes; if the offsets differ
+          from the ones in use, the change is recorded ahead of these samples.
+        """
+        if offsets is not None and offsets is not self._offsets_in_use:
+            if not np.array_equal(offsets, self._offsets_in_use):
+                self.queue.put(OffsetChange(offsets))
+            self._offsets_in_use = offsets
+        self.queue.put((sensor_ids, raw, values, timestamps))
 
-    def write_value(self, sensor_id, value):
-        self.queue.put((sensor_id, value))
+    def write_value(self, sensor_id, value, raw=0):
+        self.queue.put((np.array([sensor_id]), np.array([raw]), np.array([value]), np.array([time.monotonic()])))
 
-    def stop(self):
+    def stop(self, wait=True):
+        """Finishes writing what is queued and closes the file; wait=False returns immediately."""
         self.running = False
-        self.wait()
+        if wait:
+            self.wait()
@@ -0,0 +1,76 @@
+# device_clock.py – Maps sample times from the Nano's micros() clock onto time.monotonic()
+#
+# Bytes reach the Pi late by a varying amount (USB batching, read timeouts, scheduling)
+# but never early, so the least delayed reads show the true relation of the two clocks.
+# The window is split into slices of device time that each keep their least delayed
+# read; host = offset + rate * device is fitted through those points. The rate follows
+# the drift of the Nano's resonator (up to ~0.1 %), and the offset is taken from the
+# lower envelope, so arrival jitter does not show up in the sample times.
+from collections import deque
+import numpy as np
+
+
+class DeviceClock:
+    """
+    Converts device times (s) into host time.monotonic() values.
+
+    Args:
+    - window (float): s of device time the fit looks back over
+    - slices (int): parts of the window that each contribute their least delayed read
+    - min_span (float): s of device time needed before the rate is fitted (nominal 1.0 until then)
+    """
+
+    def __init__(self, window=10.0, slices=16, min_span=1.0):
+        self.window = window
+        self.slices = slices
+        self.min_span = min_span
+        self.reset()
+
+    def reset(self):
+        self.points = deque()   # [slice index, device time, host time] of the least delayed read per slice
+        self.rate = 1.0         # host seconds per device second
+        self.offset = None
+        self._last = -np.inf    # last host time handed out
+
+    def update(self, device_time, host_time):
+        """
+        Adds one reference: the sample taken at device_time had arrived by host_time.
+
+        Args:
+        - device_time (float): device clock of the newest sample of a read
+        - host_time (float): time.monotonic() when the read returned
+        """
+        points = self.points
+        if points and device_time < points[-1][1]:
+            self.reset()        # the device clock restarted (decoder or Nano reset)
+            points = self.points
+
+        index = int(device_time * self.slices / self.window)
+        if points and points[-1][0] == index:
+            newest = points[-1]
+            if host_time - device_time < newest[2] - newest[1]:
+                newest[1], newest[2] = device_time, host_time
+        else:
+            points.append([index, device_time, host_time])
+            while index - points[0][0] >= self.slices:
+                points.popleft()
+
+        _, device, host = np.array(points).T
+        if len(points) >= 3 and device[-1] - device[0] >= self.min_span:
+            centered = device - device.mean()
+            self.rate = float(np.dot(centered, host - host.mean()) / np.dot(centered, centered))
+        self.offset = float(np.min(host - self.rate * device))
+
+    def to_host(self, device_times):
+        """Host times of the given device times; never earlier than the times returned before."""
+        times = self.offset + self.rate * np.asarray(device_times, dtype=float)
+        if len(times):
+            # A new, less delayed reference moves the mapping back; hold instead of going back in time
+            times = np.maximum(times, self._last)
+            self._last = times[-1]
+        return times
+
+    @property
+    def drift_ppm(self):
+        """How much faster the device clock runs than the host clock, in ppm."""
+        return (1 / self.rate - 1) * 1e6
@@ -0,0 +1,196 @@
+# drive_simulator.py – Software stand-in for the RS485 servo drive (Modbus RTU on a pseudo-terminal)
+#
+# Requests are decoded and answered with pymodbus's own RTU framer and datastore, so
+# ModbusController, AsyncModbusController and misc/raspberry motor-control/system_monitor.py
+# can be pointed at simulator.port instead of /dev/com2.
+# Usage: python drive_simulator.py [latency_s]   (prints the port to connect to)
+
+import os
+import random
+import select
+import sys
+import threading
+import time
+import tty
+
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+from pymodbus.factory import ServerDecoder
+from pymodbus.framer.rtu_framer import ModbusRtuFramer
+from pymodbus.pdu import ExceptionResponse, ModbusExceptions
+
+# Power-on state, matches REGISTER_CATEGORIES in misc/raspberry motor-control/register_map.py
+INITIAL_REGISTERS = {
+    0x2009: 0x0001,  # servo disabled
+    0x3001: 0x0000,  # alarm code
+    0x3002: 0x0000,  # alarm code (second word)
+    0x6002: 0x0000,  # control word / motion status, 0 = idle
+    0x621A: 0x0000,  # PATH target position
+    0x621B: 0x0000,  # PATH systole speed
+    0x6223: 0x0000,  # PATH diastole speed
+    0x6279: 0x0000,  # homing status
+    0x627A: 0x0000,  # homing status
+}
+
+CONTROL_WORD = 0x6002
+SERVO_ENABLE = 0x2009
+ESTOP = 0x0040
+
+
+class DriveRegisters(ModbusSequentialDataBlock):
+    """Holding registers 0x0000-0xFFFF that log every write and react to the control word."""
+
+    def __init__(self, drive):
+        super().__init__(0, [0] * 0x10000)
+        self.drive = drive
+        for address, value in INITIAL_REGISTERS.items():
+            super().setValues(address, [value])
+
+    def setValues(self, address, values):
+        super().setValues(address, values)
+        self.drive._on_write(address, list(values))
+
+
+class DriveSimulator:
+    """
+    Answers Modbus RTU requests like the servo drive, on a pty pair.
+
+    Args:
+    - unit (int): slave id to answer to
+    - latency (float): s between the end of a request and the start of the response
+    - baudrate (int): wire time of every frame is added as if sent at this rate (None = instant)
+    - timeout_rate (float): share of requests that get no answer at all
+    - crc_error_rate (float): share of responses sent with a broken CRC
+    - busy_rate (float): share of requests answered with exception 0x06 (slave busy)
+    - multi_write (bool): False answers function 0x10 with IllegalFunction, like older drives
+    - motion_time (float): s until a PATH trigger written to 0x6002 reads back as idle
+    """
+
+    def __init__(self, unit=1, latency=0.002, baudrate=115200, timeout_rate=0.0, crc_error_rate=0.0,
+                 busy_rate=0.0, multi_write=True, motion_time=0.5, seed=None):
+        self.unit = unit
+        self.latency = latency
+        self.baudrate = baudrate
+        self.timeout_rate = timeout_rate
+        self.crc_error_rate = crc_error_rate
+        self.busy_rate = busy_rate
+        self.multi_write = multi_write
+        self.motion_time = motion_time
+        self.random = random.Random(seed)
+
+        self.registers = DriveRegisters(self)
+        self.context = ModbusServerContext(
+            slaves={unit: ModbusSlaveContext(hr=self.registers, zero_mode=True)}, single=False)
+        self.framer = ModbusRtuFramer(ServerDecoder())
+
+        self.write_log = []         # (time.monotonic(), address, value) per register written
+        self.requests_served = 0
+        self.errors_injected = 0
+        self._motion_done = None    # monotonic time the current PATH finishes
+
+        self._master, slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave         # kept open so the pty survives clients reconnecting
+        self._thread = None
+        self._running = False
+
+    # ------------------------------------------------------------------ drive model
+
+    def _on_write(self, address, values):
+        now = time.monotonic()
+        for offset, value in enumerate(values):
+            self.write_log.append((now, address + offset, value))
+        if address == CONTROL_WORD:
+            if values[0] == ESTOP:
+                self._motion_done = now     # stops at once
+            else:
+                self._motion_done = now + self.motion_time
+
+    def _update_motion(self):
+        if self._motion_done is not None and time.monotonic() >= self._motion_done:
+            ModbusSequentialDataBlock.setValues(self.registers, CONTROL_WORD, [0])
+            self._motion_done = None
+
+    def get(self, address):
+        """Current value of one holding register."""
+        self._update_motion()
+        return self.registers.getValues(address, 1)[0]
+
+    def set_alarm(self, code):
+        """Raises (or with 0 clears) an alarm code in 0x3001."""
+        ModbusSequentialDataBlock.setValues(self.registers, 0x3001, [code])
+
+    # ------------------------------------------------------------------ server
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="DriveSimulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _serve(self):
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                continue
+            requests = []
+            self.framer.processIncomingPacket(data, requests.append, unit=[self.unit], single=False)
+            while self.framer.isFrameReady():
+                # Several requests in one read (the framer returns one per call)
+                self.framer.processIncomingPacket(b"", requests.append, unit=[self.unit], single=False)
+            for request in requests:
+                self._answer(request, len(data))
+
+    def _wire_time(self, num_bytes):
+        return num_bytes * 10 / self.baudrate if self.baudrate else 0.0
+
+    def _answer(self, request, request_size):
+        self.requests_served += 1
+        time.sleep(self._wire_time(request_size) + self.latency)
+        self._update_motion()
+
+        if self.random.random() < self.timeout_rate:
+            self.errors_injected += 1
+            return
+        if self.random.random() < self.busy_rate:
+            self.errors_injected += 1
+            response = ExceptionResponse(request.function_code, ModbusExceptions.SlaveBusy)
+        elif request.function_code == 0x10 and not self.multi_write:
+            response = ExceptionResponse(request.function_code, ModbusExceptions.IllegalFunction)
+        else:
+            response = request.execute(self.context[self.unit])
+        response.transaction_id = request.transaction_id
+        response.unit_id = request.unit_id
+
+        packet = self.framer.buildPacket(response)
+        if self.random.random() < self.crc_error_rate:
+            self.errors_injected += 1
+            packet = packet[:-1] + bytes([packet[-1] ^ 0xFF])
+        time.sleep(self._wire_time(len(packet)))
+        os.write(self._master, packet)
+
+
+if __name__ == "__main__":
+    simulator = DriveSimulator(latency=float(sys.argv[1]) if len(sys.argv) > 1 else 0.002).start()
+    print(f"[DriveSimulator] Answering as unit {simulator.unit} on {simulator.port} (Ctrl+C to quit)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.close()
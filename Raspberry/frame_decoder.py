@@ -0,0 +1,636 @@
+# frame_decoder.py – Chunk-oriented decoders for the wire formats of the Nano firmwares
+# Every decoder turns the bytes of one serial read into (sensor_ids, raw) arrays; pick one
+# by name with create_decoder() (see DECODERS).
+#
+# bitpacked (bitpacked_pressure_sender.ino, 8N1), per sample:
+#   [5 bits pressure] [2 bits sensor ID] [1 bit flag]
+#    - Flag = 0 → low byte (P4–P0)
+#    - Flag = 1 → high byte (P9–P5)
+# 6n1 (Binary_6N1.ino, 6 data bits per byte), per sample:
+#   [P9–P4] then [P3–P0 S1 S0]
+# ascii_packets (ASCII_Pressure_Values.ino): "#1.56,1.59,1.60,1.58;" four voltages, all read from A0
+# voltage_lines (BP_speed.ino): Serial.println(voltage, 2), one sample per line
+# packed (packed_frame_sender.ino, 8N1), 18 bytes per frame of 4 sample sets:
+#   [0xA5 sync] [sequence] [15 bytes: 12 × 10-bit values, MSB first] [CRC-8 of sequence + values]
+#   with timestamps=True, 20 bytes: [0xA6 sync] [sequence] [micros() & 0xFFFF, MSB first] [values] [CRC-8]
+
+import re
+
+import numpy as np
+
+NUM_SENSORS = 3
+
+_EMPTY_IDS = np.empty(0, dtype=np.uint8)
+_EMPTY_RAW = np.empty(0, dtype=np.uint16)
+_EMPTY_TIMES = np.empty(0, dtype=float)
+_EMPTY_STARTS = np.empty(0, dtype=np.intp)
+_NEXT_SENSOR = [1, 2, 0]                                 # order the Nano sends in
+_SEQUENCE = np.tile(np.arange(NUM_SENSORS, dtype=np.uint8), 4096)   # 0, 1, 2, 0, 1, 2, ...
+
+# Packed frames
+PACKED_SYNC = 0xA5
+PACKED_TIMED_SYNC = 0xA6                                 # frames that carry a 16-bit micros() stamp
+PACKED_SETS = 4                                          # sample sets per frame
+PACKED_VALUES = PACKED_SETS * NUM_SENSORS
+PACKED_FRAME_SIZE = 2 + PACKED_VALUES * 10 // 8 + 1     # sync, sequence, values, CRC
+PACKED_STAMP_SIZE = 2
+
+# Tag (sensor ID << 1 | flag) the byte after each tag must have to complete a sample:
+# low bytes of sensors 0..2 expect their high byte, anything else can never match (0xFF)
+_HIGH_TAG = np.array([1, 0xFF, 3, 0xFF, 5, 0xFF, 0xFF, 0xFF], dtype=np.uint8)
+
+
+def _crc8_table(poly=0x07):
+    table = np.empty(256, dtype=np.uint8)
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[byte] = crc
+    return table
+
+
+_CRC8_TABLE = _crc8_table()
+
+
+def crc8(rows):
+    """
+    CRC-8 (polynomial 0x07, initial value 0) of every row of a 2D uint8 array.
+
+    Rows that end in their own CRC give 0, which is how frames are checked.
+    """
+    crc = np.zeros(len(rows), dtype=np.uint8)
+    for column in rows.T:
+        crc = _CRC8_TABLE[crc ^ column]
+    return crc
+
+
+class ChunkDecoder:
+    """Shared counters and serial settings; subclasses implement decode() and reset()."""
+
+    bytesize = 8            # data bits per character on the wire
+    device_times = None     # device clock (s) of the samples of the last decode(), for formats that send one
+    sensor_ids = np.arange(NUM_SENSORS, dtype=np.uint8)    # IDs the firmware sends samples for
+
+    def __init__(self):
+        self.reset_counters()
+        self.reset()
+
+    def reset(self):
+        """Drops any partial frame carried over from the previous chunk."""
+
+    def reset_counters(self):
+        self.samples_decoded = 0
+        self.samples_dropped = 0    # samples known to be missing (lost or corrupted bytes)
+        self.bytes_discarded = 0    # bytes that were not part of a valid sample
+        self.resyncs = 0            # places where decoding had to skip ahead
+
+    @property
+    def counters(self):
+        return {
+            "samples_decoded": self.samples_decoded,
+            "samples_dropped": self.samples_dropped,
+            "bytes_discarded": self.bytes_discarded,
+            "resyncs": self.resyncs,
+        }
+
+    @property
+    def channels(self):
+        """Sorted sensor IDs decode() can return, e.g. the columns a recording needs."""
+        return tuple(np.unique(self.sensor_ids).tolist())
+
+    @property
+    def bits_per_byte(self):
+        """Bits one byte takes on the wire (start + data + stop bit)."""
+        return self.bytesize + 2
+
+
+class BitpackedDecoder(ChunkDecoder):
+    """
+    Decodes whole chunks of the bitpacked stream with NumPy bit operations.
+
+    A sample is only accepted as a low byte directly followed by the high byte
+    of the same sensor, so a lost or damaged byte never pairs halves of two
+    different samples; the bytes around it are discarded and decoding picks up
+    at the next intact pair. Gaps in the 0, 1, 2 sensor sequence the Nano sends
+    tell how many samples went missing (see counters).
+    """
+
+    def reset(self):
+        """Drops any half-frame carried over from the previous chunk."""
+        self._carry = b""           # unpaired low byte left over from the previous chunk
+        self._last_sensor = None    # sensor of the last accepted sample, None = sequence unknown
+        self._skipped = 0           # discarded bytes after the last accepted sample
+
+    def decode(self, chunk):
+        """
+        Decodes a chunk of bytes into samples.
+
+        Args:
+        - chunk (bytes): raw bytes as read from the serial port
+
+        Returns:
+        - tuple: (sensor_ids, raw) as uint8 / uint16 arrays of equal length
+        """
+        if self._carry:
+            chunk = self._carry + chunk
+            self._carry = b""
+        if not chunk:
+            return _EMPTY_IDS, _EMPTY_RAW
+
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        tag = data & 0b00000111     # sensor ID and flag
+
+        # A sample is a low byte directly followed by the high byte of the same sensor
+        low_idx = np.flatnonzero(tag[1:] == _HIGH_TAG[tag[:-1]])
+        sensor_ids = tag[low_idx] >> 1
+        pressure_bits = data >> 3
+        raw = (pressure_bits[low_idx + 1].astype(np.uint16) << 5) | pressure_bits[low_idx]
+
+        # Keep a trailing low byte, its high byte arrives with the next chunk
+        end = len(chunk)
+        if not chunk[-1] & 0b00000001:
+            self._carry = chunk[-1:]
+            end -= 1
+
+        count = len(low_idx)
+        if count == 0:
+            self._skipped += end
+            return sensor_ids, raw
+
+        # Fast path: every byte belongs to a sample and the sensors follow each other in order
+        if 2 * count == end and not self._skipped \
+                and self._in_sequence(sensor_ids):
+            self.samples_decoded += count
+            self._last_sensor = int(sensor_ids[-1])
+        else:
+            self._check_sequence(low_idx, sensor_ids, end)
+        return sensor_ids, raw
+
+    def _in_sequence(self, sensor_ids):
+        """True if the samples continue the 0, 1, 2 order without a gap."""
+        first = int(sensor_ids[0])
+        if self._last_sensor is not None and first != _NEXT_SENSOR[self._last_sensor]:
+            return False
+        if len(sensor_ids) > len(_SEQUENCE) - first:
+            return False    # longer than the template, let the full check handle it
+        return np.array_equal(sensor_ids, _SEQUENCE[first:first + len(sensor_ids)])
+
+    def _check_sequence(self, low_idx, sensor_ids, end):
+        """Counts the bytes skipped before every sample and the samples missing from the 0, 1, 2 order."""
+        skipped = np.empty(len(low_idx), dtype=np.int64)
+        skipped[0] = low_idx[0] + self._skipped
+        skipped[1:] = low_idx[1:] - low_idx[:-1] - 2
+
+        previous = np.empty(len(low_idx), dtype=np.int64)
+        previous[0] = int(sensor_ids[0]) - 1 if self._last_sensor is None else self._last_sensor
+        previous[1:] = sensor_ids[:-1]
+        gap = (sensor_ids - previous - 1) % NUM_SENSORS
+
+        # Each lost sample leaves at most two stray bytes; a gap that the sequence
+        # alone cannot show (a whole 0, 1, 2 set) is counted from the stray bytes
+        needed = (skipped + 1) // 2
+        missing = gap + NUM_SENSORS * np.maximum(0, -((gap - needed) // NUM_SENSORS))
+        if self._last_sensor is None:
+            missing[0] = 0      # unknown start of the stream, nothing to compare with
+
+        self.samples_decoded += len(low_idx)
+        self.samples_dropped += int(missing.sum())
+        self.bytes_discarded += int(skipped.sum())
+        self.resyncs += int(np.count_nonzero(missing))
+        self._last_sensor = int(sensor_ids[-1])
+        self._skipped = end - int(low_idx[-1]) - 2
+
+
+def encode_bitpacked(sensor_ids, raw):
+    """Encodes samples the same way bitpacked_pressure_sender.ino does (used for testing)."""
+    sensor_ids = np.asarray(sensor_ids, dtype=np.uint8) & 0x03
+    raw = np.asarray(raw, dtype=np.uint16) & 0x03FF
+
+    out = np.empty(2 * len(raw), dtype=np.uint8)
+    out[0::2] = ((raw & 0b00011111) << 3) | (sensor_ids << 1)             # flag 0 = low byte
+    out[1::2] = (((raw >> 5) & 0b00011111) << 3) | (sensor_ids << 1) | 1  # flag 1 = high byte
+    return out.tobytes()
+
+
+class SixBitDecoder(ChunkDecoder):
+    """
+    Two 6-bit characters per sample, high bits first (Binary_6N1.ino).
+
+    The bytes carry no flag, so which byte starts a sample is inferred on every
+    chunk. In the right alignment the ID bits stay valid and repeat or follow
+    0, 1, 2, and ADC noise only touches the low bits of each value. In the
+    wrong one the noisy P3–P0 bits land in the top of the value, so it jumps
+    by multiples of 16 from sample to sample.
+
+    Binary_6N1.ino sends a single sensor with ID 0b01, so by default only that ID
+    is expected; samples carrying any other ID are counted as dropped.
+    """
+
+    bytesize = 6
+    MIN_PAIRS = 8   # pairs needed before an alignment is judged
+
+    def __init__(self, sensor_ids=(1,)):
+        self.sensor_ids = np.asarray(sensor_ids, dtype=np.uint8)
+        super().__init__()
+
+    def reset(self):
+        self._carry = b""
+        self._aligned = False
+
+    @staticmethod
+    def _split(data, start):
+        count = (len(data) - start) // 2
+        first = data[start:start + 2 * count:2].astype(np.uint16)
+        second = data[start + 1:start + 2 * count:2]
+        return second & 0b11, (first << 4) | (second >> 2)
+
+    @classmethod
+    def _score(cls, data, start):
+        """(ID consistency rounded to 10 %, -mean step between samples of the same sensor); higher is better."""
+        sensor_ids, raw = cls._split(data, start)
+        step = (sensor_ids[1:] + NUM_SENSORS - sensor_ids[:-1]) % NUM_SENSORS
+        fit = np.count_nonzero((step <= 1) & (sensor_ids[1:] < NUM_SENSORS)) / (len(sensor_ids) - 1)
+
+        jumps, pairs = 0, 0
+        for sensor_id in range(NUM_SENSORS):
+            values = raw[sensor_ids == sensor_id].astype(np.int32)
+            jumps += int(np.abs(np.diff(values)).sum())
+            pairs += max(0, len(values) - 1)
+        return round(fit, 1), -jumps / max(1, pairs)
+
+    def decode(self, chunk):
+        chunk = self._carry + chunk
+        self._carry = b""
+        data = np.frombuffer(chunk, dtype=np.uint8) & 0b00111111
+
+        start = 0
+        if len(data) >= 2 * self.MIN_PAIRS + 1:
+            if self._score(data, 1) > self._score(data, 0):
+                start = 1
+                if self._aligned:
+                    self.resyncs += 1
+            self._aligned = True
+        elif not self._aligned:
+            self._carry = chunk     # too little to tell the alignment yet
+            return _EMPTY_IDS, _EMPTY_RAW
+
+        sensor_ids, raw = self._split(data, start)
+        self._carry = chunk[start + 2 * len(raw):]
+        self.bytes_discarded += start
+
+        valid = np.isin(sensor_ids, self.sensor_ids)
+        if not valid.all():
+            self.samples_dropped += int(len(raw) - np.count_nonzero(valid))
+            sensor_ids, raw = sensor_ids[valid], raw[valid]
+        self.samples_decoded += len(raw)
+        return sensor_ids, raw
+
+
+class AsciiPacketDecoder(ChunkDecoder):
+    """
+    "#v0,v1,...;" text packets (ASCII_Pressure_Values.ino); value i is a sample of sensor_ids[i].
+
+    ASCII_Pressure_Values.ino reads A0 four times per packet, so by default all four
+    values belong to sensor 0. Values beyond sensor_ids are counted as dropped.
+    The firmware sends voltages with 2 decimals; they are turned back into raw counts
+    with raw = value * scale, by default with its reference voltage of 3.27 V
+    (scale=1.0 reads packets of raw counts).
+    """
+
+    PACKET = re.compile(rb"#([^#;]*);")
+    MAX_PENDING = 4096  # bytes without a complete packet before they are given up on
+
+    def __init__(self, scale=1023 / 3.27, sensor_ids=(0, 0, 0, 0)):
+        self.scale = scale
+        self.sensor_ids = np.asarray(sensor_ids, dtype=np.uint8)
+        super().__init__()
+
+    def reset(self):
+        self._pending = b""
+
+    def decode(self, chunk):
+        text = self._pending + chunk
+        end = text.rfind(b";") + 1
+        self._pending = text[end:]
+        if len(self._pending) > self.MAX_PENDING:
+            self.bytes_discarded += len(self._pending)
+            self._pending = b""
+
+        values, sensor_ids = [], []
+        width = len(self.sensor_ids)
+        for body in self.PACKET.findall(text, 0, end):
+            try:
+                packet = [float(value) for value in body.split(b",")]
+            except ValueError:
+                self.bytes_discarded += len(body) + 2
+                self.samples_dropped += 1
+                continue
+            values.extend(packet[:width])
+            sensor_ids.append(self.sensor_ids[:len(packet)])
+            self.samples_dropped += max(0, len(packet) - width)
+        if not values:
+            return _EMPTY_IDS, _EMPTY_RAW
+
+        raw = np.clip(np.round(np.array(values) * self.scale), 0, 1023).astype(np.uint16)
+        self.samples_decoded += len(raw)
+        return np.concatenate(sensor_ids), raw
+
+
+class VoltageLineDecoder(ChunkDecoder):
+    """
+    One Serial.println(voltage, 2) line per sample (BP_speed.ino).
+
+    Lines carry no sensor ID; they are assigned to sensor_ids in turn (BP_speed.ino
+    reads A0 three times, so the default is a single sensor). Voltages are turned
+    back into ADC counts with the firmware's reference voltage.
+    """
+
+    def __init__(self, vref=3.27, sensor_ids=(0,)):
+        self.vref = vref
+        self.sensor_ids = np.asarray(sensor_ids, dtype=np.uint8)
+        super().__init__()
+
+    def reset(self):
+        self._pending = b""
+        self._next = 0          # index into sensor_ids for the next line
+        self._synced = False    # the first line may have been cut off when the port was opened
+
+    def decode(self, chunk):
+        text = self._pending + chunk
+        if not self._synced:
+            start = text.find(b"\n") + 1
+            if not start:
+                self._pending = text[-64:]
+                return _EMPTY_IDS, _EMPTY_RAW
+            self.bytes_discarded += start
+            text = text[start:]
+            self._synced = True
+
+        end = text.rfind(b"\n") + 1
+        self._pending = text[end:]
+        if not end:
+            return _EMPTY_IDS, _EMPTY_RAW
+
+        values = []
+        for line in text[:end].split(b"\n")[:-1]:
+            try:
+                values.append(float(line))      # float() ignores the \r of println
+            except ValueError:
+                self.bytes_discarded += len(line) + 1
+                self.samples_dropped += 1
+        if not values:
+            return _EMPTY_IDS, _EMPTY_RAW
+
+        raw = np.clip(np.round(np.array(values) * (1023 / self.vref)), 0, 1023).astype(np.uint16)
+        order = (self._next + np.arange(len(raw))) % len(self.sensor_ids)
+        self._next = (self._next + len(raw)) % len(self.sensor_ids)
+        self.samples_decoded += len(raw)
+        return self.sensor_ids[order], raw
+
+
+class PackedFrameDecoder(ChunkDecoder):
+    """
+    Fixed-size frames of four sample sets with a sequence number and CRC-8 (packed_frame_sender.ino).
+
+    Every sync byte is a candidate frame start; a candidate is accepted if its
+    CRC checks out, it does not overlap the frame before it, and the next sync
+    byte follows it (or, at the end of a chunk, it continues the sequence). A skipped
+    sequence number means whole frames (PACKED_VALUES samples each) were lost
+    or failed the CRC.
+
+    With timestamps=True every frame also carries the low 16 bits of micros()
+    at its first sample set. The differences between frames are summed into a
+    device clock (device_times), and the sets of a frame are spread over the
+    time to the previous frame.
+
+    Args:
+    - timestamps (bool): frames carry micros() stamps (SEND_TIMESTAMPS in the sketch)
+    """
+
+    def __init__(self, timestamps=False):
+        self.timestamps = timestamps
+        self.sync = PACKED_TIMED_SYNC if timestamps else PACKED_SYNC
+        self.frame_size = PACKED_FRAME_SIZE + (PACKED_STAMP_SIZE if timestamps else 0)
+        self._values_at = self.frame_size - 1 - PACKED_VALUES * 10 // 8
+        self._offsets = np.arange(1, self.frame_size)   # sequence .. CRC, relative to the sync byte
+        super().__init__()
+
+    def reset(self):
+        self._carry = b""
+        self._sequence = None   # sequence number of the last accepted frame
+        self._stamp = None      # micros() stamp of the last accepted frame
+        self._device_us = 0     # device clock at the last accepted frame
+        self._frame_us = None   # µs from one frame to the next, last measured
+        self.device_times = _EMPTY_TIMES if self.timestamps else None
+
+    def _frame_starts(self, data):
+        """
+        Start indices of the confirmed, non-overlapping frames in data.
+
+        Returns:
+        - tuple: (starts, hold) where hold is the index of a frame that cannot be
+          confirmed before the next chunk arrives (None if there is none)
+        """
+        size = self.frame_size
+        if len(data) < size:
+            return _EMPTY_STARTS, None
+        candidates = np.flatnonzero(data[:len(data) - size + 1] == self.sync)
+        if len(candidates) == 0:
+            return candidates, None
+        valid = candidates[crc8(data[candidates[:, None] + self._offsets]) == 0]
+        if len(valid) == 0:
+            return valid, None
+        sequence = data[valid + 1].astype(np.int64)
+
+        following = valid + size
+        known = following < len(data)
+        followed = np.zeros(len(valid), dtype=bool)
+        followed[known] = data[following[known]] == self.sync
+
+        # Fast path: back-to-back frames continuing the sequence of the previous chunk
+        if self._sequence is not None and sequence[0] == (self._sequence + 1) & 0xFF \
+                and (followed[-1] or not known[-1]) \
+                and np.all(np.diff(valid) == size) and np.all(np.diff(sequence) % 256 == 1):
+            return valid, None
+
+        # About 1 in 256 stray sync bytes, and 1 in 256 frames shortened by a lost byte
+        # (which keep their sequence number), pass the CRC by chance. A frame is only taken
+        # if the next sync byte follows it; at the end of the data a frame continuing the
+        # sequence is taken right away, anything else waits for the next chunk.
+
+        starts, free, last = [], 0, self._sequence
+        for start, number, is_followed, is_known in zip(valid.tolist(), sequence.tolist(),
+                                                        followed.tolist(), known.tolist()):
+            if start < free:
+                continue
+            continues = last is not None and number == (last + 1) & 0xFF
+            if is_followed or (continues and not is_known):
+                starts.append(start)
+                free = start + size
+                last = number
+            elif not is_known:
+                return np.array(starts, dtype=np.intp), start   # decide once the next byte is in
+        return np.array(starts, dtype=np.intp), None
+
+    def decode(self, chunk):
+        chunk = self._carry + chunk
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        size = self.frame_size
+        starts, hold = self._frame_starts(data)
+
+        # Anything before the last place a frame could still start is used up
+        used = max(len(data) - size + 1, 0)
+        if len(starts):
+            used = max(used, int(starts[-1]) + size)
+        if hold is not None:
+            used = hold
+        self._carry = chunk[used:]
+        self.bytes_discarded += used - size * len(starts)
+        if len(starts) == 0:
+            if self.timestamps:
+                self.device_times = _EMPTY_TIMES
+            return _EMPTY_IDS, _EMPTY_RAW
+
+        frames = data[starts[:, None] + np.arange(size)]
+        sequence = frames[:, 1].astype(np.int64)
+        previous = np.empty(len(sequence), dtype=np.int64)
+        previous[0] = sequence[0] - 1 if self._sequence is None else self._sequence
+        previous[1:] = sequence[:-1]
+        lost = (sequence - previous - 1) % 256
+        self._sequence = int(sequence[-1])
+        if self.timestamps:
+            self.device_times = self._sample_clock(frames, lost)
+
+        # Five bytes hold four 10-bit values, most significant bits first
+        groups = frames[:, self._values_at:size - 1].reshape(-1, 5).astype(np.uint16)
+        raw = np.empty((len(groups), 4), dtype=np.uint16)
+        raw[:, 0] = (groups[:, 0] << 2) | (groups[:, 1] >> 6)
+        raw[:, 1] = ((groups[:, 1] & 0x3F) << 4) | (groups[:, 2] >> 4)
+        raw[:, 2] = ((groups[:, 2] & 0x0F) << 6) | (groups[:, 3] >> 2)
+        raw[:, 3] = ((groups[:, 3] & 0x03) << 8) | groups[:, 4]
+        raw = raw.ravel()
+
+        self.samples_decoded += len(raw)
+        self.samples_dropped += int(lost.sum()) * PACKED_VALUES
+        self.resyncs += int(np.count_nonzero(lost))
+        return np.tile(np.arange(NUM_SENSORS, dtype=np.uint8), len(starts) * PACKED_SETS), raw
+
+    def _sample_clock(self, frames, lost):
+        """Device time (s) of every sample in the frames, from the 16-bit stamps."""
+        stamps = (frames[:, 2].astype(np.int64) << 8) | frames[:, 3]
+        previous = np.empty(len(stamps), dtype=np.int64)
+        previous[0] = stamps[0] if self._stamp is None else self._stamp
+        previous[1:] = stamps[:-1]
+        elapsed = (stamps - previous) & 0xFFFF
+        self._stamp = int(stamps[-1])
+
+        # The stamp wraps every 65.5 ms; after longer gaps in the stream the
+        # lost frame count tells how many wraps to add
+        frame_count = lost + 1
+        if self._frame_us:
+            wraps = np.round((frame_count * self._frame_us - elapsed) / 0x10000)
+            elapsed += 0x10000 * np.maximum(wraps, 0).astype(np.int64)
+
+        frame_us = elapsed / frame_count
+        if self._frame_us is None:
+            # First frame of the stream: nothing to measure against yet
+            frame_us[0] = frame_us[1] if len(frame_us) > 1 else 0.0
+        measured = frame_count == 1
+        if measured.any():
+            self._frame_us = float(frame_us[np.flatnonzero(measured)[-1]])
+
+        # The sets of a frame follow each other evenly until the next frame
+        frame_times = self._device_us + np.cumsum(elapsed)
+        self._device_us = int(frame_times[-1])
+        set_times = frame_times[:, None] + frame_us[:, None] / PACKED_SETS * np.arange(PACKED_SETS)
+        return np.repeat(set_times.ravel(), NUM_SENSORS) * 1e-6
+
+
+def encode_6n1(sensor_ids, raw):
+    """Encodes samples like Binary_6N1.ino (used for testing)."""
+    sensor_ids = np.asarray(sensor_ids, dtype=np.uint8) & 0x03
+    raw = np.asarray(raw, dtype=np.uint16) & 0x03FF
+
+    out = np.empty(2 * len(raw), dtype=np.uint8)
+    out[0::2] = (raw >> 4) & 0b00111111
+    out[1::2] = ((raw & 0b1111) << 2) | sensor_ids
+    return out.tobytes()
+
+
+def encode_ascii_packets(sensor_ids, raw, vref=3.27, values_per_packet=4):
+    """Voltage packets like ASCII_Pressure_Values.ino, "#v0,v1,v2,v3;"; the last may be shorter (used for testing)."""
+    voltages = (np.asarray(raw) * (vref / 1023)).tolist()
+    packets = []
+    for start in range(0, len(voltages), values_per_packet):
+        part = voltages[start:start + values_per_packet]
+        packets.append("#" + ",".join(["%.2f"] * len(part)) % tuple(part) + ";\r\n")
+    return "".join(packets).encode()
+
+
+def encode_voltage_lines(sensor_ids, raw, vref=3.27):
+    """One println(voltage, 2) line per sample (used for testing)."""
+    voltages = np.asarray(raw) * (vref / 1023)
+    return (("%.2f\r\n" * len(voltages)) % tuple(voltages.tolist())).encode()
+
+
+def encode_packed_frames(sensor_ids, raw, sequence=0, set_times=None):
+    """
+    Encodes whole frames like packed_frame_sender.ino (used for testing).
+
+    Args:
+    - sensor_ids, raw: sample sets in sending order, a multiple of PACKED_SETS sets
+    - sequence (int): sequence number of the first frame
+    - set_times (np.ndarray): device time (s) of every set; sends timestamped frames if given
+    """
+    raw = np.asarray(raw, dtype=np.uint16) & 0x03FF
+    if len(raw) % PACKED_VALUES:
+        raise ValueError(f"Packed frames carry {PACKED_SETS} sample sets each, got {len(raw)} samples")
+    count = len(raw) // PACKED_VALUES
+
+    values = raw.reshape(-1, 4)
+    groups = np.empty((len(values), 5), dtype=np.uint16)
+    groups[:, 0] = values[:, 0] >> 2
+    groups[:, 1] = ((values[:, 0] & 0x03) << 6) | (values[:, 1] >> 4)
+    groups[:, 2] = ((values[:, 1] & 0x0F) << 4) | (values[:, 2] >> 6)
+    groups[:, 3] = ((values[:, 2] & 0x3F) << 2) | (values[:, 3] >> 8)
+    groups[:, 4] = values[:, 3] & 0xFF
+
+    values_at = 2
+    if set_times is not None:
+        values_at += PACKED_STAMP_SIZE
+    frames = np.empty((count, PACKED_FRAME_SIZE + values_at - 2), dtype=np.uint8)
+    frames[:, 0] = PACKED_SYNC
+    frames[:, 1] = (sequence + np.arange(count)) & 0xFF
+    if set_times is not None:
+        stamps = np.round(np.asarray(set_times)[::PACKED_SETS] * 1e6).astype(np.int64) & 0xFFFF
+        frames[:, 0] = PACKED_TIMED_SYNC
+        frames[:, 2] = stamps >> 8
+        frames[:, 3] = stamps & 0xFF
+    frames[:, values_at:-1] = groups.reshape(count, -1)
+    frames[:, -1] = crc8(frames[:, 1:-1])
+    return frames.tobytes()
+
+
+DECODERS = {
+    "bitpacked": BitpackedDecoder,
+    "6n1": SixBitDecoder,
+    "ascii_packets": AsciiPacketDecoder,
+    "voltage_lines": VoltageLineDecoder,
+    "packed": PackedFrameDecoder,
+}
+
+ENCODERS = {
+    "bitpacked": encode_bitpacked,
+    "6n1": encode_6n1,
+    "ascii_packets": encode_ascii_packets,
+    "voltage_lines": encode_voltage_lines,
+    "packed": encode_packed_frames,
+}
+
+
+def create_decoder(kind, **params):
+    """Creates a fresh decoder of the given kind (a key of DECODERS)."""
+    if kind not in DECODERS:
+        raise ValueError(f"Unknown protocol '{kind}'. Available: {', '.join(DECODERS)}")
+    return DECODERS[kind](**params)
@@ -0,0 +1,57 @@
+# latency_probe.py – Optional per-stage latency statistics of the sample pipeline
+#
+# Stages, each measured for the oldest sample of a SampleBatch:
+#   read      byte arrival (estimated sample time) -> serial read returned
+#   decode    read returned -> samples decoded and calibrated
+#   delivery  decoded -> GUI slot started (emit_interval batching + Qt queue)
+#   buffer    slot started -> filtered and inserted into the plot buffers
+#   render    inserted -> curve updated by the next plot refresh
+#   total     byte arrival -> curve updated
+from collections import deque
+import numpy as np
+
+STAGES = ("read", "decode", "delivery", "buffer", "render", "total")
+
+
+class LatencyProbe:
+    """Keeps the last `capacity` durations per stage and reports their percentiles."""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.samples = {stage: deque(maxlen=capacity) for stage in STAGES}
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def record_batch(self, stamps, delivered, inserted):
+        """
+        Records the stages up to buffer insert for one batch.
+
+        Args:
+        - stamps (dict): SampleBatch.stamps with "arrival", "read" and "decode" (time.monotonic())
+        - delivered (float): time the GUI slot started
+        - inserted (float): time the batch was in the plot buffers
+        """
+        self.record("read", stamps["read"] - stamps["arrival"])
+        self.record("decode", stamps["decode"] - stamps["read"])
+        self.record("delivery", delivered - stamps["decode"])
+        self.record("buffer", inserted - delivered)
+
+    def percentiles(self, q=(50, 99)):
+        """{stage: (count, p50, p99)} in seconds; stages without data are left out."""
+        result = {}
+        for stage, values in self.samples.items():
+            if values:
+                result[stage] = (len(values), *np.percentile(np.fromiter(values, float), q))
+        return result
+
+    def report(self):
+        """Multi-line table in milliseconds for the developer panel."""
+        lines = [f"{'stage':9s}{'p50 ms':>9s}{'p99 ms':>9s}{'n':>7s}"]
+        for stage, (count, p50, p99) in self.percentiles().items():
+            lines.append(f"{stage:9s}{p50 * 1000:9.2f}{p99 * 1000:9.2f}{count:7d}")
+        return "\n".join(lines)
+
+    def reset(self):
+        for values in self.samples.values():
+            values.clear()
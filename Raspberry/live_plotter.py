@@ -2,20 +2,42 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout
 from PyQt5.QtCore import QTimer, pyqtSignal
 import pyqtgraph as pg
 import numpy as np
+import time
 from functools import partial
 
+from beat_detector import BeatDetector
+
+from ring_buffer import RingBuffer
+from running_stats import SlidingWindowStats
+from signal_filters import create_filter
+
 class LivePlotter(QWidget):
     stats_updated = pyqtSignal(str, dict)
+    beat_detected = pyqtSignal(str, dict)   # channel, per-beat metrics from BeatDetector
 
-    def __init__(self, parent_widget=None, use_real_data=False):
+    BEAT_CHANNELS = ("LVP", "AOP")
+    BEAT_TIMEOUT = 3.0  # s without a beat before the labels fall back to window statistics
+    RATE_INTERVAL = 1.0     # s of sample timestamps per sample rate measurement
+    RATE_TOLERANCE = 0.1    # relative change of the measured rate that redesigns the filters
+
+    def __init__(self, parent_widget=None, use_real_data=False, window_size=200, sample_rate=1000.0):
         super().__init__(parent_widget.centralWidget() if parent_widget and hasattr(parent_widget, "centralWidget") else parent_widget)
         self.setGeometry(40, 130, 700, 430)
         self.setStyleSheet("background-color: black; color: white;")
 
         self.use_real_data = True
-        self.use_smoothing = True
+        self.sample_rate = sample_rate  # per channel, used to design the low-pass filters; measured from the data
+        self.filter_kind = "moving_average"
+        self.filter_params = {"length": 5}
+        self._rate_channel = None       # channel whose timestamps the sample rate is measured on
+        self._rate_start = None         # first timestamp of the current measurement
+        self._rate_count = 0            # samples since then
         self.external_labels = {}
 
+        # Optional LatencyProbe (developer mode); GUI reports inserts with note_inserted()
+        self.latency_probe = None
+        self._unrendered = None     # (arrival, inserted) of the oldest sample not drawn yet
+
         self.layout = QVBoxLayout(self)
         self.plot_widget = pg.GraphicsLayoutWidget()
         self.plot_widget.setBackground('k')
@@ -25,11 +47,12 @@ class LivePlotter(QWidget):
         self.channels = {}
         self.curves = {}
 
-        self.x = list(range(200))
+        self.window_size = window_size
+        self.x = np.arange(window_size)
 
         for name in self.ordered_names:
             color = {"LVP": "green", "AOP": "red", "LAP": "yellow", "FLOW": "cyan"}[name]
-            data = [0] * 200
+            data = RingBuffer(window_size)
 
             plot = self.plot_widget.addPlot()
             plot.setYRange(0, 180 if name != "FLOW" else 20)
@@ -45,6 +68,9 @@ class LivePlotter(QWidget):
             self.channels[name] = {
                 'color': color,
                 'data': data,
+                'filter': self._create_filter(),
+                'stats': SlidingWindowStats(window_size),
+                'beats': BeatDetector() if name in self.BEAT_CHANNELS else None,
                 'plot': plot,
                 'curve': curve,
                 'visible': True
@@ -68,46 +94,118 @@ class LivePlotter(QWidget):
         self.external_labels = label_map
 
     def receive_data(self, name, value):
+        self.receive_batch(name, np.array([value], dtype=float))
+
+    def receive_batch(self, name, values, timestamps=None):
+        """Filters a whole array of new samples once and appends it to one channel."""
         if name in self.channels:
-            self.channels[name]['data'].append(value)
-            if len(self.channels[name]['data']) > 200:
-                self.channels[name]['data'].pop(0)
+            config = self.channels[name]
+            if timestamps is not None and len(timestamps):
+                self._measure_sample_rate(name, timestamps)
+            values = config['filter'].process(values)
+            config['data'].extend(values)
+            config['stats'].extend(values)
+
+            if config['beats'] is not None and timestamps is not None:
+                for beat in config['beats'].process(timestamps, values):
+                    self.beat_detected.emit(name, beat)
+                    self.update_label(name, beat)
 
     def refresh_plot(self):
         for name in self.ordered_names:
             if self.channels[name]['visible']:
                 self.update_curve(name)
 
+        if self.latency_probe is not None and self._unrendered is not None:
+            now = time.monotonic()
+            arrival, inserted = self._unrendered
+            self.latency_probe.record("render", now - inserted)
+            self.latency_probe.record("total", now - arrival)
+            self._unrendered = None
+
+    def note_inserted(self, arrival, inserted):
+        """Marks samples as waiting for the next refresh (render latency is measured from the oldest)."""
+        if self._unrendered is None:
+            self._unrendered = (arrival, inserted)
+
     def update_plot(self, name):
-        config = self.channels[name]
         new_value = np.random.randint(30, 140) if name != "FLOW" else np.random.randint(0, 15)
-        config['data'] = config['data'][1:] + [new_value]
+        self.receive_data(name, new_value)
         self.update_curve(name)
 
     def update_curve(self, name):
         config = self.channels[name]
-        data = config['data']
-        ydata = np.convolve(data, np.ones(5) / 5, mode='same') if self.use_smoothing else data
+        ydata = config['data'].view()     # already filtered on arrival
         config['curve'].setData(self.x[-len(ydata):], ydata)
 
+        # Beating channels are reported per beat through beat_detected instead
+        if self.has_recent_beat(name):
+            return
+
+        # Window statistics are maintained incrementally as samples arrive
+        stats = config['stats']
         if len(ydata) > 0:
-            systole = int(max(ydata))
-            diastole = int(min(ydata))
-            mean_val = sum(ydata) / len(ydata)
-
-            self.stats_updated.emit(name, {
-                "systole": systole,
-                "diastole": diastole,
-                "mean": mean_val
-            })
-
-            if name in self.external_labels:
-                label = self.external_labels[name]
-                if name == "FLOW":
-                    label.setText(f"{name}\n{mean_val:.1f}")
-                else:
-                    label.setText(f"{name}\n{systole}/{diastole}")
-                label.setStyleSheet(f"color: {config['color']}; font-weight: bold; background-color: transparent;")
+            window_stats = {
+                "systole": int(stats.systole),
+                "diastole": int(stats.diastole),
+                "mean": stats.mean
+            }
+            self.stats_updated.emit(name, window_stats)
+            self.update_label(name, window_stats)
+
+    def set_filter(self, kind, **params):
+        """Switches all channels to a new filter (see signal_filters.FILTERS) with fresh state."""
+        self.filter_kind = kind
+        self.filter_params = params
+        for config in self.channels.values():
+            config['filter'] = self._create_filter()
+
+    def _create_filter(self):
+        params = dict(self.filter_params)
+        if self.filter_kind in ("fir_lowpass", "iir_lowpass"):
+            params.setdefault("sample_rate", self.sample_rate)     # cutoffs are in Hz
+        return create_filter(self.filter_kind, **params)
+
+    def _measure_sample_rate(self, name, timestamps):
+        """
+        Measures the per-channel sample rate over RATE_INTERVAL and redesigns the
+        filters for it when it moved by more than RATE_TOLERANCE (the Nano's set
+        rate depends on its firmware and loop time, not on a fixed clock).
+        """
+        if self._rate_channel is None:
+            self._rate_channel = name
+        if name != self._rate_channel:
+            return
+        if self._rate_start is None:
+            self._rate_start = timestamps[0]
+            self._rate_count = -1   # the first sample only starts the interval
+        self._rate_count += len(timestamps)
+        span = timestamps[-1] - self._rate_start
+        if span < self.RATE_INTERVAL:
+            return
+
+        rate = self._rate_count / span
+        self._rate_start = None
+        if span > 3 * self.RATE_INTERVAL:
+            return      # the stream paused, the count says nothing about the rate
+        if abs(rate - self.sample_rate) > self.RATE_TOLERANCE * self.sample_rate:
+            print(f"[LivePlotter] Sample rate {rate:.0f}/s per channel, redesigning filters")
+            self.sample_rate = rate
+            self.set_filter(self.filter_kind, **self.filter_params)
+
+    def has_recent_beat(self, name):
+        detector = self.channels[name]['beats']
+        return detector is not None and detector.last_beat_time is not None and \
+            time.monotonic() - detector.last_beat_time < self.BEAT_TIMEOUT
+
+    def update_label(self, name, stats):
+        if name in self.external_labels:
+            label = self.external_labels[name]
+            if name == "FLOW":
+                label.setText(f"{name}\n{stats['mean']:.1f}")
+            else:
+                label.setText(f"{name}\n{int(stats['systole'])}/{int(stats['diastole'])}")
+            label.setStyleSheet(f"color: {self.channels[name]['color']}; font-weight: bold; background-color: transparent;")
 
     def toggle_channel(self, name):
         config = self.channels[name]
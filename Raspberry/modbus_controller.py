@@ -1,61 +1,234 @@
 # This the new ModbusController CLASS code !
 
 from pymodbus.client.sync import ModbusSerialClient as ModbusClient
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.pdu import ExceptionResponse, ModbusExceptions
+from pymodbus.register_read_message import ReadHoldingRegistersRequest
+from pymodbus.register_write_message import WriteMultipleRegistersRequest, WriteSingleRegisterRequest
 import time
 
-class ModbusController:
-    def __init__(self, port='/dev/com2', baudrate=115200):
-        # Configure Modbus RTU connection
-        self.client = ModbusClient(
-            method='rtu',
-            port=port,
-            baudrate=baudrate,
-            parity='N',
-            stopbits=1,
-            bytesize=8,
-            timeout=1
-        )
-        # Attempt to connect to the RS485 device
-        self.connected = self.client.connect()
-        if not self.connected:
-            print("Warning: Modbus device not found. Running in offline mode.")
+PROBE_REGISTER = 0x6002  # read by probe() as a cheap "is the drive answering" check
+
+# Command registers: writing the same value again triggers the action again, so never skip them
+NEVER_CACHED = {
+    0x6002,  # control word (start, E-Stop, trigger PATH)
+    0x2009,  # servo enable / disable
+}
+
+
+class CommandPreempted(Exception):
+    """Raised inside a controller call when a more urgent command is waiting for the bus."""
+
+
+class ModbusOffline(Exception):
+    """Raised by the motor commands when the drive is offline, so nothing was sent."""
+
+    def __init__(self, message="offline"):
+        super().__init__(message)
+
+
+class ModbusWriteFailed(Exception):
+    """Raised by the motor commands when the drive did not confirm a write (error reply or no answer)."""
+
+    def __init__(self, addresses):
+        self.addresses = list(addresses)
+        super().__init__("write to " + ", ".join(hex(address) for address in self.addresses) + " not confirmed")
+
+
+class RegisterCache:
+    """Last value confirmed by the drive per register address, with the time it was confirmed."""
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age  # s; reads of older entries go to the bus (None = no expiry)
+        self._entries = {}      # address -> (value, confirmed_at)
+
+    def get(self, address, max_age=None):
+        """Returns the cached value, or None if unknown or older than max_age (default: self.max_age)."""
+        entry = self._entries.get(address)
+        if entry is None:
+            return None
+        max_age = self.max_age if max_age is None else max_age
+        if max_age is not None and time.monotonic() - entry[1] > max_age:
+            return None
+        return entry[0]
+
+    def is_dirty(self, address, value):
+        """True if writing value would change what the drive is known to hold."""
+        if address in NEVER_CACHED:
+            return True
+        entry = self._entries.get(address)
+        return entry is None or entry[0] != value
+
+    def update(self, address, value):
+        if address not in NEVER_CACHED:
+            self._entries[address] = (value, time.monotonic())
+
+    def invalidate(self, address=None):
+        """Forgets one address, or everything if address is None."""
+        if address is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(address, None)
 
-            # here should the RECONNECTING LOOP take place
 
-    def write_register(self, address, value):
-        """Write a single value to a Modbus register."""
+def group_registers(registers, cache):
+    """
+    Splits {address: value} into runs of consecutive addresses, leaving out
+    registers the cache says already hold their value.
+
+    Returns:
+    - list: (start_address, [values]) per run, in address order
+    """
+    groups = []
+    dirty = [address for address in sorted(registers) if cache.is_dirty(address, registers[address])]
+    for address in dirty:
+        if groups and address == groups[-1][0] + len(groups[-1][1]):
+            groups[-1][1].append(registers[address])
+        else:
+            groups.append((address, [registers[address]]))
+    return groups
+
+
+class Pause:
+    """Step of a ModbusRegisters generator: wait before the next request (ends early if pre-empted)."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+class ModbusRegisters:
+    """
+    Register access and motor commands, written once for every transport.
+
+    The underscore methods below are generators that leave the I/O to the
+    controller: they yield a pymodbus request (and are sent back the response, or
+    None if the drive did not answer) or a Pause, and return their result.
+    ModbusController drives them over the blocking pymodbus client,
+    AsyncModbusController over its event loop, so the cache, the grouping and the
+    single-write fallback exist once.
+    """
+
+    def __init__(self, cache_max_age=None, unit=1, **kwargs):
+        super().__init__(**kwargs)
+        self.unit = unit
+        self.connected = False
+
+        # Cleared when the drive rejects function 0x10, from then on registers are written one by one
+        self.multi_write_supported = True
+
+        # Writes of unchanged values are skipped, reads may be served from here
+        self.cache = RegisterCache(max_age=cache_max_age)
+
+    def _probe(self):
+        """Cheap health check (one register read). A silent drive is only reported, the supervisor decides when it is gone."""
+        if not self.connected:
+            return False
+        # An exception response still proves the drive is there, only a missing answer does not
+        alive = (yield ReadHoldingRegistersRequest(PROBE_REGISTER, 1)) is not None
+        if not alive:
+            print("Warning: Modbus drive not answering.")
+        return alive
+
+    def _write_register(self, address, value, force=False):
+        """Write a single value to a Modbus register (skipped if the drive already holds it, unless force)."""
         if not self.connected:
             print(f"Warning: Modbus offline. Cannot write {hex(value)} to {hex(address)}.")
-            return
+            return False
+        if not force and not self.cache.is_dirty(address, value):
+            return True
 
-        try:
-            result = self.client.write_register(address, value, unit=1)
-            if result.isError():
-                print(f"Failed to write to register {hex(address)}")
-            else:
-                print(f"Successfully wrote {hex(value)} to register {hex(address)}")
-        except Exception as e:
-            print(f"Error: {e}")
+        result = yield WriteSingleRegisterRequest(address, value)
+        if result is None or result.isError():
+            print(f"Failed to write to register {hex(address)}")
+            self.cache.invalidate(address)
+            return False
+        print(f"Successfully wrote {hex(value)} to register {hex(address)}")
+        self.cache.update(address, value)
+        return True
 
-    def read_register(self, address):
-        """Read a single value from a Modbus register."""
+    def _write_registers(self, address, values):
+        """Write consecutive registers starting at address in one transaction (function 0x10)."""
+        if not self.connected:
+            print(f"Warning: Modbus offline. Cannot write {len(values)} registers at {hex(address)}.")
+            return False
+
+        result = yield WriteMultipleRegistersRequest(address, list(values))
+        if result is None or result.isError():
+            print(f"Failed to write registers {hex(address)}..{hex(address + len(values) - 1)}")
+            for offset in range(len(values)):
+                self.cache.invalidate(address + offset)
+            if isinstance(result, ExceptionResponse) and result.exception_code == ModbusExceptions.IllegalFunction:
+                print("Drive does not support function 0x10, writing registers one by one from now on.")
+                self.multi_write_supported = False
+            return False
+        print(f"Successfully wrote {[hex(v) for v in values]} to registers starting at {hex(address)}")
+        for offset, value in enumerate(values):
+            self.cache.update(address + offset, value)
+        return True
+
+    def _write_register_block(self, registers):
+        """
+        Writes several registers with as few transactions as possible.
+
+        Registers already holding their value (see RegisterCache) are left out.
+        Consecutive addresses are grouped into one write_registers request. Gaps are
+        never bridged, since that would overwrite the registers in between. If the
+        drive rejects a multi-register write, the group is written register by register.
+
+        Args:
+        - registers (dict): {address: value}
+
+        Returns:
+        - bool: True if every register was written
+        """
+        ok = True
+        for start, values in group_registers(registers, self.cache):
+            if len(values) > 1 and self.multi_write_supported:
+                if (yield from self._write_registers(start, values)):
+                    continue
+                if not self.connected:
+                    return False
+            for offset, value in enumerate(values):
+                ok = (yield from self._write_register(start + offset, value)) and ok
+        return ok
+
+    def _read_register(self, address, max_age=0):
+        """
+        Read a single value from a Modbus register.
+
+        With max_age (seconds) a cached value confirmed at most that long ago is
+        returned without bus traffic; None uses the cache's default staleness.
+        The default 0 always reads from the drive.
+        """
         if not self.connected:
             #print(f"Warning: Modbus offline. Cannot read register {hex(address)}.")
             return None
 
-        try:
-            result = self.client.read_holding_registers(address, 1, unit=1)
-            if result.isError():
-                print(f"Failed to read register {hex(address)}")
-            else:
-                value = result.registers[0]
-                print(f"Value at register {hex(address)}: {hex(value)}")
-                return value
-        except Exception as e:
-            print(f"Error: {e}")
+        if max_age != 0:
+            cached = self.cache.get(address, max_age)
+            if cached is not None:
+                return cached
+
+        result = yield ReadHoldingRegistersRequest(address, 1)
+        if result is None or result.isError():
+            print(f"Failed to read register {hex(address)}")
             return None
+        value = result.registers[0]
+        print(f"Value at register {hex(address)}: {hex(value)}")
+        self.cache.update(address, value)
+        return value
+
+    def _write_or_raise(self, address, value):
+        """_write_register() for the motor commands: an unconfirmed write fails the command."""
+        if not (yield from self._write_register(address, value)):
+            raise ModbusWriteFailed([address])
 
-    def calculate_speeds(self, hub: float, frequency: int) -> tuple:
+    def _write_block_or_raise(self, registers):
+        if not (yield from self._write_register_block(registers)):
+            raise ModbusWriteFailed(sorted(registers))
+
+    @staticmethod
+    def calculate_speeds(hub: float, frequency: int) -> tuple:
         """
         Berechnet forward_speed und backward_speed als Hex-Werte.
 
@@ -88,58 +261,184 @@ class ModbusController:
         #print(f"Systole Speed = {forward_speed}, Diastole Speed {backward_speed}, Pulses = {pulse}") # Debug message
         return forward_speed, backward_speed, pulse
 
-    def set_motor_speed(self, frequency: int, hub: float):
+    def _set_motor_speed(self, frequency: int, hub: float):
         """Calculates and writes new motor speeds based on frequency and stroke."""
         if not self.connected:
-            #print("Warning: Modbus offline. Cannot update motor speed.")
-            return
+            raise ModbusOffline()
 
         sys_speed, dia_speed, _ = self.calculate_speeds(hub, frequency)
-        self.write_register(0x621B, sys_speed)  # Update systole speed
-        self.write_register(0x6223, dia_speed)  # Update diastole speed
+        yield from self._write_block_or_raise({
+            0x621B: sys_speed,  # Update systole speed
+            0x6223: dia_speed,  # Update diastole speed
+        })
         #print(f"Motor speed updated: Systole={sys_speed} RPM, Diastole={dia_speed} RPM")
         #print(f"Triggering the PATH again")
 
-    def set_motor_target_position(self, frequency: int, hub: float):
+    def _set_motor_target_position(self, frequency: int, hub: float):
         """Calculates and writes new target position based on stroke volume."""
         if not self.connected:
-            #print("Warning: Modbus offline. Cannot update motor position.")
-            return
+            raise ModbusOffline()
 
         _, _, target_position = self.calculate_speeds(hub, frequency)
-        self.write_register(0x621A, target_position)  # Update target position
+        yield from self._write_or_raise(0x621A, target_position)  # Update target position
         #print(f"Motor position updated: Target position = {target_position}")
         #print(f"Triggering the PATH again")
 
-    def start_motor(self):
+    def _set_motor_parameters(self, frequency: int, hub: float):
+        """Writes target position and both speeds; 0x621A/0x621B go out as one transaction."""
+        if not self.connected:
+            raise ModbusOffline()
+
+        sys_speed, dia_speed, target_position = self.calculate_speeds(hub, frequency)
+        yield from self._write_block_or_raise({
+            0x621A: target_position,  # Update target position
+            0x621B: sys_speed,        # Update systole speed
+            0x6223: dia_speed,        # Update diastole speed
+        })
+
+    def _start_motor(self):
         """Start motor."""
         #print("TESTING: start_motor() called - Starting the motor...")
         if not self.connected:
-            #print("Warning: Modbus offline. Cannot start motor.") #debug message
-            return
-        self.write_register(0x6002, 0x0013)
+            raise ModbusOffline()
+        yield from self._write_or_raise(0x6002, 0x0013)
 
-    def stop_motor(self):
+    def _stop_motor(self):
         """Stops the motor immediately by triggering an emergency stop and disabling the servo."""
         if not self.connected:
-            #print("Warning: Modbus offline. Cannot stop motor.") #debug message
-            return
+            raise ModbusOffline()
 
-        self.write_register(0x6002, 0x0040)  # E-Stop
-        self.write_register(0x2009, 0x0001)  # Servo disable
+        failed = []
+        if not (yield from self._write_register(0x6002, 0x0040)):  # E-Stop
+            failed.append(0x6002)
+        # Disable the servo even if the E-Stop went unconfirmed
+        if not (yield from self._write_register(0x2009, 0x0001)):  # Servo disable
+            failed.append(0x2009)
+        if failed:
+            raise ModbusWriteFailed(failed)
         #print("Motor stopped: Emergency stop triggered, servo disabled.") #debug message
 
-    def reset_motor_position(self):
+    def _reset_motor_position(self):
         """Resets the motor back to home position. After enabling the servo (in case it's disabled)."""
         if not self.connected:
-            print("Warning: Modbus offline. Cannot reset motor position.")
-            return
+            raise ModbusOffline()
 
         print("Resetting the servo motor...")
-        self.write_register(0x2009, 0x0000)  # Servo enable
-        time.sleep(1)
-        self.write_register(0x6002, 0x0040)  # E-Stop
-        self.write_register(0x6002, 0x001F)  # Trigger PATH 15 (home)
+        self.cache.invalidate()  # homing may change drive state behind our back
+        yield from self._write_or_raise(0x2009, 0x0000)  # Servo enable
+        yield Pause(1)
+        yield from self._write_or_raise(0x6002, 0x0040)  # E-Stop
+        yield from self._write_or_raise(0x6002, 0x001F)  # Trigger PATH 15 (home)
+
+
+class ModbusController(ModbusRegisters):
+    """ModbusRegisters over the blocking pymodbus client; every call returns once the drive has answered."""
+
+    def __init__(self, port='/dev/com2', baudrate=115200, cache_max_age=None, unit=1):
+        super().__init__(cache_max_age=cache_max_age, unit=unit)
+        # Configure Modbus RTU connection
+        self.client = ModbusClient(
+            method='rtu',
+            port=port,
+            baudrate=baudrate,
+            parity='N',
+            stopbits=1,
+            bytesize=8,
+            timeout=1
+        )
+
+        # Set by ModbusWorker while an urgent command (E-Stop) waits; the call in
+        # progress then gives up the bus before its next transaction or pause
+        self.preempt_event = None
+
+        # Attempt to connect to the RS485 device
+        self.connected = self.client.connect()
+        if not self.connected:
+            print("Warning: Modbus device not found. Running in offline mode.")
+            # ModbusWorker keeps calling connect() with backoff until the adapter is back
+
+    def _checkpoint(self):
+        """Called before every transaction of a command; aborts it if something more urgent is queued."""
+        if self.preempt_event is not None and self.preempt_event.is_set():
+            raise CommandPreempted()
+
+    def _pause(self, seconds):
+        """time.sleep() that ends early (with CommandPreempted) when something more urgent is queued."""
+        if self.preempt_event is None:
+            time.sleep(seconds)
+        elif self.preempt_event.wait(seconds):
+            raise CommandPreempted()
+
+    def _transact(self, request):
+        """Sends one request and returns the response, or None if the drive did not answer."""
+        self._checkpoint()
+        request.unit_id = self.unit
+        try:
+            result = self.client.execute(request)
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
+        if isinstance(result, ModbusIOException):
+            return None
+        return result
+
+    def _drive(self, steps):
+        """Runs a ModbusRegisters generator to the end on this thread and returns its result."""
+        try:
+            step = next(steps)
+            while True:
+                if isinstance(step, Pause):
+                    self._pause(step.seconds)
+                    step = steps.send(None)
+                else:
+                    step = steps.send(self._transact(step))
+        except StopIteration as done:
+            return done.value
+
+    def connect(self):
+        """(Re)opens the serial port. The register cache is dropped, the drive may have restarted."""
+        self.client.close()
+        self.cache.invalidate()
+        self.connected = self.client.connect()
+        return self.connected
+
+    def disconnect(self):
+        """Gives up a drive that stopped answering; connect() opens the port again."""
+        self.client.close()
+        self.connected = False
+
+    def probe(self):
+        return self._drive(self._probe())
+
+    def write_register(self, address, value, force=False):
+        return self._drive(self._write_register(address, value, force))
+
+    def write_registers(self, address, values):
+        return self._drive(self._write_registers(address, values))
+
+    def write_register_block(self, registers: dict) -> bool:
+        return self._drive(self._write_register_block(registers))
+
+    def read_register(self, address, max_age=0):
+        return self._drive(self._read_register(address, max_age))
+
+    def set_motor_speed(self, frequency: int, hub: float):
+        self._drive(self._set_motor_speed(frequency, hub))
+
+    def set_motor_target_position(self, frequency: int, hub: float):
+        self._drive(self._set_motor_target_position(frequency, hub))
+
+    def set_motor_parameters(self, frequency: int, hub: float):
+        self._drive(self._set_motor_parameters(frequency, hub))
+
+    def start_motor(self):
+        self._drive(self._start_motor())
+
+    def stop_motor(self):
+        self._drive(self._stop_motor())
+
+    def reset_motor_position(self):
+        self._drive(self._reset_motor_position())
 
     def close(self):
         """Closes the Modbus connection cleanly."""
@@ -0,0 +1,283 @@
+# modbus_worker.py – Single long-lived thread that owns all ModbusController traffic
+from PyQt5.QtCore import QThread, pyqtSignal
+import threading
+import time
+
+from modbus_controller import CommandPreempted, ModbusOffline
+
+PRIORITY_URGENT = 0     # E-Stop: jumps the queue and pre-empts the command on the bus
+PRIORITY_NORMAL = 1
+
+# Queued before a stop, these would move the motor again right after it
+MOTION_COMMANDS = ("start_motor", "reset_motor_position")
+
+# Consecutive unanswered probes before a connected drive counts as lost; one reply
+# dropped by noise on the RS485 line is not worth a reconnect
+PROBE_MISSES = 2
+
+
+class ModbusCommand:
+    """One queued call on the ModbusController."""
+
+    def __init__(self, name, func, args, key=None, priority=PRIORITY_NORMAL):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.key = key                      # commands with the same key replace each other while queued
+        self.priority = priority
+        self.queued_at = time.monotonic()
+
+    def cancel(self):
+        """Called when the command leaves the queue without being sent (replaced or dropped by a stop)."""
+
+    def retry(self):
+        """The command to queue again after it was pre-empted."""
+        return self
+
+
+class CommandQueue:
+    """
+    Commands waiting for the bus, shared by ModbusWorker and AsyncModbusController.
+
+    Not thread-safe: ModbusWorker only touches it under its condition,
+    AsyncModbusController only from its event loop.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.current = None                 # command on the bus, None between commands
+
+    def put(self, command):
+        """
+        Queues command behind those of equal or higher priority; a queued command with the same key is replaced.
+
+        Returns:
+        - bool: True if the command on the bus has to give way to it
+        """
+        if command.key is not None:
+            for queued in self.pending:
+                if queued.key == command.key:
+                    # The caller has been waiting since the first of the coalesced requests
+                    command.queued_at = queued.queued_at
+                    self.pending.remove(queued)
+                    queued.cancel()
+                    break
+        self._insert(command)
+        return self.current is not None and command.priority < self.current.priority
+
+    def _insert(self, command):
+        index = len(self.pending)
+        while index > 0 and self.pending[index - 1].priority > command.priority:
+            index -= 1
+        self.pending.insert(index, command)
+
+    def take(self):
+        """Moves the next command onto the bus; None if nothing is queued."""
+        self.current = self.pending.pop(0) if self.pending else None
+        return self.current
+
+    def discard(self, names):
+        for queued in [queued for queued in self.pending if queued.name in names]:
+            self.pending.remove(queued)
+            queued.cancel()
+
+    def requeue(self, command):
+        """
+        Takes back a pre-empted command. Parameter updates are idempotent and are
+        queued again to finish after the urgent command, unless a newer one with the
+        same key is already waiting; motion commands are dropped.
+
+        Returns:
+        - bool: True if the command was queued again
+        """
+        self.current = None
+        if command.key is None or any(queued.key == command.key for queued in self.pending):
+            return False
+        self._insert(command.retry())
+        return True
+
+
+class ConnectionSupervisor:
+    """
+    Connection supervision shared by ModbusWorker and AsyncModbusController.
+
+    check() is a generator run between commands: it yields "probe", "connect" or
+    "disconnect" for the owner to carry out on its bus (sent back True if it worked)
+    and returns the seconds until the next check. While online the drive is probed
+    every probe_interval seconds (PROBE_MISSES unanswered probes in a row mean it is
+    gone), while offline it reconnects with exponential backoff.
+
+    Args:
+    - state_changed (callable): called with "connected", "reconnecting" or "disconnected"
+    - reconnected (callable): called when the drive is back after having been lost
+    """
+
+    def __init__(self, state_changed, reconnected, probe_interval=2.0, min_backoff=0.5, max_backoff=8.0):
+        self.state_changed = state_changed
+        self.reconnected = reconnected
+        self.probe_interval = probe_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.state = None
+        self._backoff = min_backoff
+        self._probe_misses = 0
+
+    def check(self, connected):
+        if connected:
+            if (yield "probe"):
+                self._probe_misses = 0
+                self._set_state("connected")
+                self._backoff = self.min_backoff
+                return self.probe_interval
+            self._probe_misses += 1
+            if self.state == "connected" and self._probe_misses < PROBE_MISSES:
+                # Ask again soon instead of dropping a link that may only have lost one reply
+                return self.min_backoff
+            yield "disconnect"
+        if self.state in (None, "connected"):
+            # Lost it just now, or not there at startup: report, then retry right away
+            self._set_state("disconnected")
+            self._backoff = self.min_backoff
+            return 0.0
+
+        self._set_state("reconnecting")
+        if (yield "connect") and (yield "probe"):
+            self._probe_misses = 0
+            self._set_state("connected")
+            self._backoff = self.min_backoff
+            self.reconnected()
+            return self.probe_interval
+        yield "disconnect"
+        delay = self._backoff
+        self._backoff = min(2 * self._backoff, self.max_backoff)
+        return delay
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.state_changed(state)
+
+
+class ModbusWorker(QThread):
+    """
+    Runs ModbusController calls one after another on a single thread.
+
+    Parameter updates are coalesced: while one is still queued, a newer one
+    replaces it, so a long-press sends only the latest HR/SV pair instead of
+    every intermediate step.
+
+    Urgent commands (stop_motor) are queued ahead of everything else. If a normal
+    command is on the bus when one arrives, it is aborted before its next
+    transaction; a pre-empted parameter update is queued again, a pre-empted
+    motion command is dropped (see CommandQueue).
+
+    Between commands the worker also supervises the connection (see
+    ConnectionSupervisor) and re-sends the last motor parameters once the drive
+    is back.
+    """
+    command_finished = pyqtSignal(str, float)   # command name, latency from first request to done (s)
+    command_failed = pyqtSignal(str, str)       # command name, error message
+    connection_state_changed = pyqtSignal(str)  # "connected", "reconnecting" or "disconnected"
+
+    def __init__(self, modbus, probe_interval=2.0, min_backoff=0.5, max_backoff=8.0, parent=None):
+        super().__init__(parent)
+        self.modbus = modbus
+        self.running = True
+        self._queue = CommandQueue()
+        self._condition = threading.Condition()
+        self._preempt = threading.Event()
+        self.modbus.preempt_event = self._preempt
+
+        self.supervisor = ConnectionSupervisor(self.connection_state_changed.emit, self._restore_parameters,
+                                               probe_interval, min_backoff, max_backoff)
+        self._next_check = time.monotonic()
+        self._last_parameters = None
+
+    @property
+    def connection_state(self):
+        return self.supervisor.state
+
+    def submit(self, name, func, *args, key=None, priority=PRIORITY_NORMAL):
+        """Queues func(*args) behind the commands of equal or higher priority; a queued command with the same key is replaced."""
+        with self._condition:
+            if self._queue.put(ModbusCommand(name, func, args, key, priority)):
+                self._preempt.set()
+            self._condition.notify()
+
+    def set_motor_parameters(self, frequency, stroke_volume):
+        self._last_parameters = (frequency, stroke_volume)
+        self.submit("motor_parameters", self.modbus.set_motor_parameters, frequency, stroke_volume, key="motor_parameters")
+
+    def _restore_parameters(self):
+        if self._last_parameters is not None:
+            # The drive may have restarted; restore the parameters the GUI shows
+            self.set_motor_parameters(*self._last_parameters)
+
+    def start_motor(self):
+        self.submit("start_motor", self.modbus.start_motor)
+
+    def stop_motor(self):
+        with self._condition:
+            self._queue.discard(MOTION_COMMANDS)
+        self.submit("stop_motor", self.modbus.stop_motor, priority=PRIORITY_URGENT)
+
+    def reset_motor_position(self):
+        self.submit("reset_motor_position", self.modbus.reset_motor_position)
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self.running and not self._queue.pending:
+                    timeout = self._next_check - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                if not self.running and not self._queue.pending:
+                    return
+                command = self._queue.take()
+                self._preempt.clear()
+
+            if command is None:
+                self._supervise()
+                continue
+
+            try:
+                command.func(*command.args)
+            except CommandPreempted:
+                self._preempted(command)
+                continue
+            except ModbusOffline as e:
+                # Nothing reached the drive; never report that as done (least of all a stop)
+                print(f"Warning: Modbus offline. {command.name} not sent.")
+                self.command_failed.emit(command.name, str(e))
+                continue
+            except Exception as e:
+                print(f"Modbus Error: {e}")
+                self.command_failed.emit(command.name, str(e))
+                continue
+            self.command_finished.emit(command.name, time.monotonic() - command.queued_at)
+
+    def _preempted(self, command):
+        with self._condition:
+            requeued = self._queue.requeue(command)
+        print(f"Modbus: {command.name} pre-empted" + (", queued again" if requeued else ""))
+        if not requeued:
+            self.command_failed.emit(command.name, "pre-empted by an urgent command")
+
+    def _supervise(self):
+        """Runs one ConnectionSupervisor check on this thread."""
+        actions = {"probe": self.modbus.probe, "connect": self.modbus.connect, "disconnect": self.modbus.disconnect}
+        check = self.supervisor.check(self.modbus.connected)
+        try:
+            action = next(check)
+            while True:
+                action = check.send(actions[action]())
+        except StopIteration as done:
+            self._next_check = time.monotonic() + done.value
+
+    def stop(self):
+        """Stops once the commands already queued have been sent."""
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+        self.wait()
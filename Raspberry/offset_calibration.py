@@ -0,0 +1,96 @@
+# offset_calibration.py – Zero offset calibration on the decoded sample stream
+#
+# Fed with the (sensor_ids, raw) arrays SensorReaderThread decodes anyway, so acquisition
+# and plotting carry on while it runs. Chunks are only counted and kept until every sensor
+# has num_samples samples; then one np.bincount turns them into a 10-bit histogram per
+# sensor, from which the offsets are taken.
+import time
+import numpy as np
+
+from frame_decoder import NUM_SENSORS
+
+ADC_LEVELS = 1024
+MAD_TO_SIGMA = 1.4826   # MAD of normally distributed noise times this is its standard deviation
+
+
+class OffsetCalibration:
+    """
+    Collects raw samples of all sensors until each has num_samples (or timeout passed).
+
+    Args:
+    - num_samples (int): samples per sensor
+    - timeout (float): s after which the calibration finishes with what it has
+    """
+
+    def __init__(self, num_samples=2000, timeout=10.0):
+        self.num_samples = num_samples
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.counts = np.zeros(NUM_SENSORS, dtype=np.int64)     # samples kept per sensor
+        self._bins = []     # sensor_id * ADC_LEVELS + raw of the kept samples, per chunk
+
+    def add(self, sensor_ids, raw):
+        """
+        Adds one decoded chunk; samples beyond num_samples of a sensor are ignored.
+
+        Returns:
+        - bool: True once every sensor has num_samples
+        """
+        missing = self.num_samples - self.counts
+        if len(raw) <= missing.min():
+            kept = sensor_ids
+        else:
+            # Take only the first `missing` samples of each sensor
+            rank = np.empty(len(raw), dtype=np.int64)
+            for sensor_id in range(NUM_SENSORS):
+                mask = sensor_ids == sensor_id
+                rank[mask] = np.arange(np.count_nonzero(mask))
+            keep = rank < missing[sensor_ids]
+            kept, raw = sensor_ids[keep], raw[keep]
+        self._bins.append(kept.astype(np.int64) * ADC_LEVELS + raw)
+        self.counts += np.bincount(kept, minlength=NUM_SENSORS)
+        return self.done
+
+    @property
+    def done(self):
+        return bool((self.counts >= self.num_samples).all())
+
+    @property
+    def expired(self):
+        return time.monotonic() - self.started > self.timeout
+
+    def result(self):
+        """
+        Statistics of every sensor's samples in raw ADC counts.
+
+        Returns:
+        - list: one dict per sensor_id with count, mode, median and noise (standard
+          deviation estimated from the median absolute deviation); None without samples
+        """
+        levels = np.arange(ADC_LEVELS)
+        bins = np.concatenate(self._bins) if self._bins else np.empty(0, dtype=np.int64)
+        histograms = np.bincount(bins, minlength=NUM_SENSORS * ADC_LEVELS).reshape(NUM_SENSORS, ADC_LEVELS)
+        stats = []
+        for histogram in histograms:
+            count = int(histogram.sum())
+            if not count:
+                stats.append(None)
+                continue
+            median = self._weighted_median(levels, histogram)
+            stats.append({
+                "count": count,
+                "mode": int(np.argmax(histogram)),
+                "median": median,
+                "noise": MAD_TO_SIGMA * self._weighted_median(np.abs(levels - median), histogram),
+            })
+        return stats
+
+    @staticmethod
+    def _weighted_median(values, weights):
+        """Median of a sample in which values[i] occurs weights[i] times."""
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        count = cumulative[-1]
+        lower = values[order[np.searchsorted(cumulative, (count + 1) // 2)]]
+        upper = values[order[np.searchsorted(cumulative, count // 2 + 1)]]
+        return float(lower + upper) / 2
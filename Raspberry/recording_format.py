@@ -0,0 +1,173 @@
+# recording_format.py – Writers for CSV / binary recordings and a memory-mapped binary reader
+#
+# Binary layout (little endian):
+#   MAGIC (8 bytes) | JSON header, space padded to HEADER_SIZE - 8 bytes | records...
+#   record = uint32 time since header["start_time"] in TIME_UNIT steps + one uint16 raw ADC count
+#            per entry of header["channels"] (LVP, AOP, LAP unless the firmware sends fewer sensors)
+# Calibrations during a recording go to header["offset_changes"] (room for about 20 per file).
+
+import json
+import os
+import numpy as np
+
+MAGIC = b"MLREC\x00\x01\n"
+HEADER_SIZE = 1024
+TIME_UNIT = 1e-5    # 10 µs steps, a uint32 covers ~11.9 hours
+
+CHANNELS = ["LVP", "AOP", "LAP"]    # name of each sensor_id
+
+
+def record_dtype(num_channels=len(CHANNELS)):
+    return np.dtype([("t", "<u4"), ("raw", "<u2", (num_channels,))])
+
+
+RECORD_DTYPE = record_dtype()
+
+
+class CsvRecordingWriter:
+    """timestamp,LVP,AOP,LAP text rows in mmHg (only the recorded channels)."""
+
+    extension = ".csv"
+
+    def __init__(self, filename, channels=CHANNELS, **header):
+        self.row_format = "%.6f" + ",%.2f" * len(channels) + "\n"
+        self.file = open(filename, "w", buffering=1 << 20)
+        self.file.write("timestamp," + ",".join(channels) + "\n")
+
+    def write_rows(self, timestamps, values, raw):
+        rows = np.column_stack((timestamps, values)).ravel().tolist()
+        self.file.write((self.row_format * len(timestamps)) % tuple(rows))
+
+    def set_offsets(self, record_index, offsets):
+        """Nothing to do, rows are written in mmHg with the offsets of their time."""
+
+    def flush(self, sync=False):
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush(sync=True)
+        self.file.close()
+
+
+class BinaryRecordingWriter:
+    """Fixed-width raw records behind a JSON header holding everything needed to convert them."""
+
+    extension = ".mlrec"
+
+    def __init__(self, filename, start_time, offsets, gains, sample_rate=None, channels=CHANNELS):
+        self.header = {
+            "channels": list(channels),
+            "offsets": [float(v) for v in offsets],
+            "offset_changes": [],        # [record index, offsets] of every calibration during the recording
+            "gains": [float(v) for v in gains],
+            "sample_rate": sample_rate,
+            "start_time": start_time,    # epoch seconds of t = 0, moved to the first row once it arrives
+            "time_unit": TIME_UNIT,
+            "num_records": 0,
+        }
+        self.file = open(filename, "wb", buffering=1 << 20)
+        self._write_header()
+
+    def _write_header(self):
+        text = json.dumps(self.header).encode()
+        if len(MAGIC) + len(text) > HEADER_SIZE:
+            raise ValueError("Recording header too large.")
+        self.file.seek(0)
+        self.file.write(MAGIC + text.ljust(HEADER_SIZE - len(MAGIC)))
+        self.file.seek(0, os.SEEK_END)
+
+    def write_rows(self, timestamps, values, raw):
+        if not self.header["num_records"]:
+            # Rows may have been sampled slightly before the writer was created; t must not go negative
+            self.header["start_time"] = float(timestamps[0])
+            self._first_time = timestamps[0]
+            self._write_header()
+
+        records = np.empty(len(timestamps), dtype=record_dtype(len(self.header["channels"])))
+        records["t"] = np.round((timestamps - self.header["start_time"]) / TIME_UNIT)
+        records["raw"] = raw
+        self.file.write(records.tobytes())
+        self._last_time = timestamps[-1]
+        self.header["num_records"] += len(records)
+
+    def set_offsets(self, record_index, offsets):
+        """Records new zero offsets that apply from record_index on."""
+        self.header["offset_changes"].append([int(record_index), [float(v) for v in offsets]])
+        try:
+            self._write_header()
+        except ValueError:
+            self.header["offset_changes"].pop()
+            print(f"[BinaryRecordingWriter] Warning: no room in the header for more offset changes, "
+                  f"records from {record_index} on keep the previous offsets.")
+
+    def flush(self, sync=False):
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        # The measured row rate replaces the nominal one once the recording is complete
+        if self.header["num_records"] > 1 and self._last_time > self._first_time:
+            self.header["sample_rate"] = (self.header["num_records"] - 1) / (self._last_time - self._first_time)
+        self._write_header()
+        self.flush(sync=True)
+        self.file.close()
+
+
+WRITERS = {
+    "csv": CsvRecordingWriter,
+    "binary": BinaryRecordingWriter,
+}
+
+
+class Recording:
+    """A binary recording opened with load_recording(); arrays are views into the mapped file."""
+
+    def __init__(self, header, records):
+        self.header = header
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def raw(self):
+        """(n, channels) uint16 raw ADC counts, memory-mapped."""
+        return self.records["raw"]
+
+    @property
+    def timestamps(self):
+        """Epoch seconds of every row."""
+        return self.header["start_time"] + self.records["t"] * self.header["time_unit"]
+
+    def pressures(self):
+        """(n, channels) pressures in mmHg using the calibration stored in the header, including later changes."""
+        changes = self.header.get("offset_changes", [])
+        starts = [0] + [index for index, _ in changes]
+        ends = starts[1:] + [len(self)]
+        offsets = [self.header["offsets"]] + [changed for _, changed in changes]
+
+        gains = np.asarray(self.header["gains"])
+        pressures = np.empty(self.raw.shape)
+        for start, end, segment_offsets in zip(starts, ends, offsets):
+            pressures[start:end] = gains * (self.raw[start:end] - np.asarray(segment_offsets))
+        return pressures
+
+
+def load_recording(filename):
+    """Memory-maps a binary recording without parsing its records."""
+    with open(filename, "rb") as file:
+        head = file.read(HEADER_SIZE)
+    if not head.startswith(MAGIC):
+        raise ValueError(f"{filename} is not a binary recording.")
+    header = json.loads(head[len(MAGIC):].decode())
+
+    # num_records is only final after close(), so size the map from the file itself
+    dtype = record_dtype(len(header["channels"]))
+    count = (os.path.getsize(filename) - HEADER_SIZE) // dtype.itemsize
+    if count == 0:
+        return Recording(header, np.empty(0, dtype=dtype))
+    records = np.memmap(filename, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+    return Recording(header, records)
@@ -0,0 +1,49 @@
+# ring_buffer.py – Fixed-capacity NumPy ring buffer for the plot channels
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Preallocated ring buffer holding the last `capacity` samples of one channel.
+
+    Every sample is stored twice (at i and i + capacity), so the window in
+    chronological order is always one contiguous slice and view() never copies.
+    There is a single writer (the GUI thread), so no locking is needed.
+    """
+
+    def __init__(self, capacity, dtype=float, fill=0):
+        self.capacity = capacity
+        self._data = np.full(2 * capacity, fill, dtype=dtype)
+        self._head = 0  # index of the oldest sample
+
+    def __len__(self):
+        return self.capacity
+
+    def append(self, value):
+        """Overwrites the oldest sample with `value`."""
+        self._data[self._head] = value
+        self._data[self._head + self.capacity] = value
+        self._head = (self._head + 1) % self.capacity
+
+    def extend(self, values):
+        """Appends an array of samples with at most two slice copies."""
+        n = len(values)
+        if n >= self.capacity:
+            values = values[n - self.capacity:]
+            n = self.capacity
+
+        first = min(n, self.capacity - self._head)
+        rest = n - first
+        head = self._head
+        self._data[head:head + first] = values[:first]
+        self._data[head + self.capacity:head + self.capacity + first] = values[:first]
+        if rest:
+            self._data[:rest] = values[first:]
+            self._data[self.capacity:self.capacity + rest] = values[first:]
+        self._head = (head + n) % self.capacity
+
+    def view(self):
+        """Returns the window oldest-first as a read-only view (valid until the next write)."""
+        window = self._data[self._head:self._head + self.capacity]
+        window.flags.writeable = False
+        return window
@@ -0,0 +1,62 @@
+# running_stats.py – Sliding-window max/min/mean updated as samples arrive
+from collections import deque
+import math
+
+
+class SlidingWindowStats:
+    """
+    Keeps max, min and mean of the last `window` samples with O(1) amortized work per sample.
+
+    Max and min use monotonic deques of (index, value); the mean uses a running sum
+    that is re-summed exactly once per window to stop floating point drift.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque()
+        self._max = deque()   # values strictly decreasing from left to right
+        self._min = deque()   # values strictly increasing from left to right
+        self._sum = 0.0
+        self._index = 0
+
+    def push(self, value):
+        """Adds one sample and drops the one that left the window."""
+        index = self._index
+        self._index += 1
+
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+        if index % self.window == 0:
+            self._sum = math.fsum(self._values)
+
+        oldest = index - self.window
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+
+    def extend(self, values):
+        """Adds an array of samples."""
+        for value in values.tolist():
+            self.push(value)
+
+    @property
+    def systole(self):
+        return self._max[0][1] if self._max else 0
+
+    @property
+    def diastole(self):
+        return self._min[0][1] if self._min else 0
+
+    @property
+    def mean(self):
+        return self._sum / len(self._values) if self._values else 0.0
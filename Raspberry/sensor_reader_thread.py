@@ -1,33 +1,84 @@
 # SensorReaderThread.py – Handles serial communication for 3 pressure sensors
 from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot
-from collections import Counter
+import numpy as np
+import select
 import time
 
+from device_clock import DeviceClock
+from frame_decoder import create_decoder
+from offset_calibration import OffsetCalibration
+
+
+class SampleBatch:
+    """Samples of all sensors decoded during one emit interval, as flat arrays in arrival order."""
+
+    def __init__(self, sensor_ids, raw, values, timestamps, stamps=None):
+        self.sensor_ids = sensor_ids    # uint8, 0..2
+        self.raw = raw                  # uint16, raw ADC counts
+        self.values = values            # float, pressure in mmHg
+        self.timestamps = timestamps    # float, time.monotonic() of each sample (see SensorReaderThread._sample_times)
+        self.stamps = stamps            # pipeline times of the oldest sample, see latency_probe.py
+
+    def __len__(self):
+        return len(self.values)
+
+    def channel(self, sensor_id):
+        """Returns (timestamps, values) of one sensor."""
+        mask = self.sensor_ids == sensor_id
+        return self.timestamps[mask], self.values[mask]
+
+
 class SensorReaderThread(QThread):
-    data_received = pyqtSignal(int, float)    # sensor_id, pressure in mmHg
+    batch_received = pyqtSignal(object)       # SampleBatch, emitted every emit_interval seconds
     calibration_finished = pyqtSignal(list)   # offsets for GUI, optional
     request_calibration = pyqtSignal()        # GUI to Thread
 
-    def __init__(self, port="/dev/ttyUSB0", baudrate=115200, parent=None):
+    def __init__(self, port="/dev/ttyUSB0", baudrate=115200, emit_interval=0.015, read_timeout=0.005,
+                 idle_timeout=0.5, protocol="bitpacked", protocol_params=None, parent=None):
         super().__init__(parent)
         self.running = True
         self.port = port
         self.baudrate = baudrate
-        self.partial_data = {i: {'low': None, 'high': None} for i in range(3)}
 
-        # Sensor calibration
+        # Wire format of the firmware on the Nano, see frame_decoder.DECODERS
+        self.decoder = create_decoder(protocol, **(protocol_params or {}))
+
+        # Maps the device clock of timestamped formats onto time.monotonic()
+        self.device_clock = DeviceClock()
+
+        # The thread sleeps in select() until the first byte arrives and then takes what
+        # is pending. While decoded samples wait for their batch it wakes at the emit
+        # deadline, otherwise only every idle_timeout seconds (to notice stop()), so a
+        # silent Nano costs next to no CPU. While data streams in, reads are at least
+        # read_timeout apart, which bounds the added latency without waking per USB packet.
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self.read_size = 4096
+
+        # Decoded samples are collected and emitted as one SampleBatch per interval
+        self.emit_interval = emit_interval
+        self._pending = []
+        self._pending_stamps = None
+        self._last_emit = time.monotonic()
+        self._last_read_time = None
+
+        # Optional RecorderThread fed straight from this thread (never through the GUI)
+        self.recorder = None
+
+        # Sensor calibration (zero offsets in raw ADC counts, indexed by sensor_id)
         self.VREF = 3.3
-        self.sensor1_OFFSET = 118
-        self.sensor2_OFFSET = 135
-        self.sensor3_OFFSET = 123
+        self.offsets = np.array([118, 135, 123], dtype=float)
 
-        # Calibration data
-        self.sensor1_k = (330 - 0) / (932 - 118)
-        self.sensor2_k = (330 - 0) / (920 - 135)
-        self.sensor3_k = (330 - 0) / (914 - 123)
+        # Calibration data (mmHg per ADC count, indexed by sensor_id)
+        self.gains = np.array([
+            (330 - 0) / (932 - 118),
+            (330 - 0) / (920 - 135),
+            (330 - 0) / (914 - 123),
+        ])
 
-        # Thread-safe flag for calibration request
+        # Thread-safe flag for calibration request; the running calibration is fed from run()
         self.calibration_requested = False
+        self.calibration = None
 
         # Connect signal to slot internally (for external .emit())
         self.request_calibration.connect(self.start_offset_calibration)
@@ -35,50 +86,100 @@ class SensorReaderThread(QThread):
     def run(self):
         import serial
         try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+            self.ser = serial.Serial(self.port, self.baudrate, bytesize=self.decoder.bytesize, timeout=self.read_timeout)
         except Exception as e:
             print(f"Serial error: {e}")
             return
 
         while self.running:
-            # Calibration request handling
+            # Calibration runs alongside acquisition on the decoded samples
             if self.calibration_requested:
-                self._perform_calibration()
                 self.calibration_requested = False
-                continue  # Resume main loop for normal acquisition
+                print("[SensorReaderThread] Collecting zero offset samples...")
+                self.calibration = OffsetCalibration()
 
-            # Standard data acquisition
-            if self.ser.in_waiting:
-                byte = self.ser.read(1)[0]
-                flag = byte & 0b00000001
-                sensor_id = (byte >> 1) & 0b00000011
-                pressure_bits = (byte >> 3) & 0b00011111
+            # Standard data acquisition: block until read_timeout, then decode everything received
+            chunk = self._read_chunk()
+            if chunk:
+                read_time = time.monotonic()
+                sensor_ids, raw = self.decoder.decode(chunk)
+                if len(raw):
+                    if self.calibration is not None and self.calibration.add(sensor_ids, raw):
+                        self._finish_calibration()
 
-                if flag == 0:
-                    self.partial_data[sensor_id]['low'] = pressure_bits
-                else:
-                    self.partial_data[sensor_id]['high'] = pressure_bits
-
-                if (self.partial_data[sensor_id]['low'] is not None and self.partial_data[sensor_id]['high'] is not None):
-                    low = self.partial_data[sensor_id]['low']
-                    high = self.partial_data[sensor_id]['high']
-                    pressure_raw = (high << 5) | low
+                    timestamps = self._sample_times(len(raw), len(chunk), read_time, self.decoder.device_times)
 
                     # Apply calibration offsets
-                    if sensor_id == 0:
-                        pressure_mmHg = self.sensor1_k * (pressure_raw - self.sensor1_OFFSET)
-                    elif sensor_id == 1:
-                        pressure_mmHg = self.sensor2_k * (pressure_raw - self.sensor2_OFFSET)
-                    elif sensor_id == 2:
-                        pressure_mmHg = self.sensor3_k * (pressure_raw - self.sensor3_OFFSET)
+                    values = self.gains[sensor_ids] * (raw - self.offsets[sensor_ids])
+
+                    recorder = self.recorder
+                    if recorder is not None:
+                        recorder.write_batch(sensor_ids, raw, values, timestamps, offsets=self.offsets)
+                    if not self._pending:
+                        self._pending_stamps = {"arrival": timestamps[0], "read": read_time,
+                                                "decode": time.monotonic()}
+                    self._pending.append((sensor_ids, raw, values, timestamps))
+                self._last_read_time = read_time
+
+            if self.calibration is not None and self.calibration.expired:
+                print("[SensorReaderThread] Calibration timeout.")
+                self._finish_calibration()
+            self._emit_pending()
 
-                    self.data_received.emit(sensor_id, pressure_mmHg)
+        self._emit_pending(force=True)
+        self.ser.close()
 
-                    # Reset for next sample
-                    self.partial_data[sensor_id]['low'] = None
-                    self.partial_data[sensor_id]['high'] = None
+    def _read_chunk(self):
+        """Waits in select() for the first byte (see __init__), then returns every byte pending."""
+        if self._last_read_time is not None:
+            gather = self._last_read_time + self.read_timeout - time.monotonic()
+            if gather > 0:
+                time.sleep(gather)
+        waiting = self.ser.in_waiting
+        if not waiting:
+            if self._pending:
+                timeout = max(0.0, self._last_emit + self.emit_interval - time.monotonic())
+            else:
+                timeout = self.idle_timeout
+            ready, _, _ = select.select([self.ser], [], [], timeout)
+            if not ready:
+                return b""
+            waiting = self.ser.in_waiting
+        return self.ser.read(min(max(waiting, 1), self.read_size))
+
+    def _sample_times(self, num_samples, num_bytes, read_time, device_times=None):
+        """
+        Host times of the samples of one read.
+
+        With device_times (timestamped formats) these are the Nano's own sample
+        times, mapped onto time.monotonic() by device_clock. Otherwise the samples
+        are spread evenly over the time their bytes were arriving: from the previous
+        read (or as far back as the bytes take on the wire) until now.
+        """
+        if device_times is not None:
+            self.device_clock.update(device_times[-1], read_time)
+            return self.device_clock.to_host(device_times)
+
+        started = read_time - num_bytes * self.decoder.bits_per_byte / self.baudrate
+        if self._last_read_time is not None:
+            started = max(started, self._last_read_time)
+        step = (read_time - started) / num_samples
+        return started + step * np.arange(1, num_samples + 1)
+
+    def set_recorder(self, recorder):
+        """Starts (RecorderThread) or stops (None) handing every decoded read to a recorder."""
+        self.recorder = recorder
+
+    def _emit_pending(self, force=False):
+        """Emits everything decoded since the last batch once emit_interval has passed."""
+        now = time.monotonic()
+        if not self._pending or (not force and now - self._last_emit < self.emit_interval):
+            return
+        self._last_emit = now
 
-        self.ser.close()
+        sensor_ids, raw, values, timestamps = (np.concatenate(parts) for parts in zip(*self._pending))
+        self._pending = []
+        self.batch_received.emit(SampleBatch(sensor_ids, raw, values, timestamps, self._pending_stamps))
 
     @pyqtSlot()
     def start_offset_calibration(self):
@@ -86,60 +187,23 @@ class SensorReaderThread(QThread):
         print("[SensorReaderThread] Calibration requested.")
         self.calibration_requested = True
 
-    def _perform_calibration(self):
-        print("[SensorReaderThread] Collecting zero offset samples...")
-        num_samples = 2000
-        sample_data = {0: [], 1: [], 2: []}
-        started = time.time()
-
-        # Collect samples
-        while any(len(samples) < num_samples for samples in sample_data.values()) and self.running:
-            if self.ser.in_waiting:
-                byte = self.ser.read(1)[0]
-                flag = byte & 0b00000001
-                sensor_id = (byte >> 1) & 0b00000011
-                pressure_bits = (byte >> 3) & 0b00011111
-
-                if flag == 0:
-                    self.partial_data[sensor_id]['low'] = pressure_bits
-                else:
-                    self.partial_data[sensor_id]['high'] = pressure_bits
-
-                if (self.partial_data[sensor_id]['low'] is not None and
-                    self.partial_data[sensor_id]['high'] is not None and
-                    len(sample_data[sensor_id]) < num_samples):
-
-                    low = self.partial_data[sensor_id]['low']
-                    high = self.partial_data[sensor_id]['high']
-                    pressure_raw = (high << 5) | low
-
-                    sample_data[sensor_id].append(pressure_raw)
-
-                    self.partial_data[sensor_id]['low'] = None
-                    self.partial_data[sensor_id]['high'] = None
-
-            if time.time() - started > 10:  # Timeout after 10s
-                print("[SensorReaderThread] Calibration timeout.")
-                break
-
-        # Find mode for each sensor's samples
-        offsets = []
-        for sid in (0, 1, 2):
-            samples = sample_data[sid]
-            if samples:
-                try:
-                    mode_val, _ = Counter(samples).most_common(1)[0]
-                except Exception:
-                    import numpy as np
-                    mode_val = int(np.median(samples))
-            else:
-                print(f"[SensorReaderThread] Warning: no data for sensor {sid}.")
-                mode_val = 0
-            offsets.append(mode_val)
-
-        # Set new offsets
-        self.sensor1_OFFSET, self.sensor2_OFFSET, self.sensor3_OFFSET = offsets
-
+    def _finish_calibration(self):
+        """Takes the most common raw value of every sensor as its new zero offset."""
+        offsets = self.offsets.copy()
+        for sid, stats in enumerate(self.calibration.result()):
+            if stats is None:
+                print(f"[SensorReaderThread] Warning: no data for sensor {sid}, keeping offset {offsets[sid]:g}.")
+                continue
+            offsets[sid] = stats["mode"]
+            print(f"[SensorReaderThread] Sensor {sid}: mode {stats['mode']}, median {stats['median']:g}, "
+                  f"noise {stats['noise']:.2f} counts ({stats['count']} samples)")
+        self.calibration = None
+
+        # Swap in a new array rather than writing into the old one, so the GUI thread
+        # (e.g. a recording header) never sees half old, half new offsets
+        self.offsets = offsets
+
+        offsets = [int(offset) for offset in offsets]
         print(f"[SensorReaderThread] Calibration complete. New zero offsets: {offsets}")
         self.calibration_finished.emit(offsets)
 
@@ -0,0 +1,93 @@
+# signal_filters.py – Stateful streaming filters applied to each channel as samples arrive
+# Every filter keeps its state between calls, so each sample is filtered exactly once
+# and filtering a batch costs time proportional to the batch, not to the plot window.
+import math
+import numpy as np
+
+
+class PassThroughFilter:
+    """Leaves the samples untouched."""
+
+    def process(self, values):
+        return values
+
+
+class MovingAverageFilter:
+    """Causal moving average over the last `length` samples."""
+
+    def __init__(self, length=5):
+        self.length = length
+        self._history = None    # last length-1 input samples
+
+    def process(self, values):
+        if self._history is None:
+            # Start as if the signal had been constant before the first sample
+            self._history = np.full(self.length - 1, values[0] if len(values) else 0.0)
+        x = np.concatenate((self._history, values))
+        self._history = x[len(x) - (self.length - 1):]
+
+        csum = np.cumsum(x)
+        csum = np.concatenate(([0.0], csum))
+        return (csum[self.length:] - csum[:-self.length]) / self.length
+
+
+class FIRLowPassFilter:
+    """Windowed-sinc (Hamming) FIR low-pass with `taps` coefficients."""
+
+    def __init__(self, cutoff=20.0, sample_rate=1000.0, taps=31):
+        n = np.arange(taps) - (taps - 1) / 2
+        h = np.sinc(2 * cutoff / sample_rate * n) * np.hamming(taps)
+        self.coefficients = h / h.sum()
+        self._history = None    # last taps-1 input samples
+
+    def process(self, values):
+        taps = len(self.coefficients)
+        if self._history is None:
+            self._history = np.full(taps - 1, values[0] if len(values) else 0.0)
+        x = np.concatenate((self._history, values))
+        self._history = x[len(x) - (taps - 1):]
+        return np.convolve(x, self.coefficients, mode='valid')
+
+
+class IIRLowPassFilter:
+    """Second-order Butterworth low-pass (bilinear transform), direct form II transposed."""
+
+    def __init__(self, cutoff=20.0, sample_rate=1000.0):
+        k = math.tan(math.pi * cutoff / sample_rate)
+        norm = 1 / (1 + math.sqrt(2) * k + k * k)
+        self.b = (k * k * norm, 2 * k * k * norm, k * k * norm)
+        self.a = (2 * (k * k - 1) * norm, (1 - math.sqrt(2) * k + k * k) * norm)
+        self._z = None
+
+    def process(self, values):
+        b0, b1, b2 = self.b
+        a1, a2 = self.a
+        if self._z is None:
+            # Steady state for a constant input equal to the first sample
+            x0 = values[0] if len(values) else 0.0
+            self._z = [x0 * (1 - b0), x0 * (b2 - a2)]
+        z1, z2 = self._z
+
+        out = np.empty(len(values))
+        for i, x in enumerate(values.tolist()):
+            y = b0 * x + z1
+            z1 = b1 * x - a1 * y + z2
+            z2 = b2 * x - a2 * y
+            out[i] = y
+        self._z = [z1, z2]
+        return out
+
+
+FILTERS = {
+    "none": PassThroughFilter,
+    "moving_average": MovingAverageFilter,
+    "fir_lowpass": FIRLowPassFilter,
+    "iir_lowpass": IIRLowPassFilter,
+}
+
+
+def create_filter(kind, **params):
+    """Creates a fresh filter of the given kind (a key of FILTERS)."""
+    if kind not in FILTERS:
+        raise ValueError(f"Unknown filter '{kind}'. Available: {', '.join(FILTERS)}")
+    return FILTERS[kind](**params)
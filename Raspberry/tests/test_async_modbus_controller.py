@@ -0,0 +1,55 @@
+# test_async_modbus_controller.py – Command results reported by AsyncModbusController
+# Usage: python -m pytest tests
+
+import os
+import sys
+import time
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from async_modbus_controller import AsyncModbusController
+from drive_simulator import DriveSimulator
+from modbus_controller import ModbusWriteFailed
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def drive():
+    drive = DriveSimulator(latency=0.0).start()
+    yield drive
+    drive.close()
+
+
+def wait_for(app, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    app.processEvents()
+    return condition()
+
+
+def test_unconfirmed_stop_fails_the_future(app, drive):
+    modbus = AsyncModbusController(port=drive.port, timeout=0.2, probe_interval=30.0)
+    states, finished, failed = [], [], []
+    modbus.connection_state_changed.connect(states.append)
+    modbus.command_finished.connect(lambda name, latency: finished.append(name))
+    modbus.command_failed.connect(lambda name, message: failed.append((name, message)))
+    modbus.start()
+    try:
+        assert wait_for(app, lambda: states == ["connected"])
+        drive.timeout_rate = 1.0
+        future = modbus.stop_motor()
+        assert isinstance(future.exception(timeout=5.0), ModbusWriteFailed)
+        assert wait_for(app, lambda: failed)
+    finally:
+        modbus.stop()
+    assert failed == [("stop_motor", "write to 0x6002, 0x2009 not confirmed")]
+    assert finished == []
+    assert drive.errors_injected == 2     # both writes were tried
@@ -0,0 +1,87 @@
+# test_data_recorder.py – Recordings hold a column for every sensor the decoder produces
+# Usage: python -m pytest tests
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data_recorder import RecorderThread
+from frame_decoder import create_decoder, encode_voltage_lines
+from recording_format import load_recording
+
+
+def record(filename, file_format, sensor_ids, raw, channels):
+    timestamps = 100.0 + np.arange(len(raw)) * 0.001
+    recorder = RecorderThread(filename, file_format=file_format, offsets=(100, 110, 120), gains=(0.5, 0.5, 0.5),
+                              sensor_ids=channels)
+    recorder.start()
+    for start in range(0, len(raw), 50):
+        part = slice(start, start + 50)
+        values = 0.5 * (raw[part] - np.array([100, 110, 120])[sensor_ids[part]])
+        recorder.write_batch(sensor_ids[part], raw[part], values, timestamps[part])
+    recorder.stop()
+    return recorder
+
+
+@pytest.mark.parametrize("file_format", ["csv", "binary"])
+def test_single_sensor_decoder_gets_one_column(tmp_path, file_format):
+    decoder = create_decoder("voltage_lines")
+    raw = np.random.default_rng(0).integers(100, 1000, 301)
+    sensor_ids, decoded = decoder.decode(b"\n" + encode_voltage_lines(None, raw))
+    assert len(decoded) == 301
+
+    filename = str(tmp_path / f"single.{file_format}")
+    recorder = record(filename, file_format, sensor_ids, decoded, decoder.channels)
+    assert recorder.rows_written == 301
+
+    if file_format == "csv":
+        with open(filename) as file:
+            lines = file.read().splitlines()
+        assert lines[0] == "timestamp,LVP"
+        assert len(lines) == 302
+    else:
+        recording = load_recording(filename)
+        assert recording.header["channels"] == ["LVP"]
+        assert np.array_equal(recording.raw[:, 0], decoded)
+        assert np.allclose(recording.pressures()[:, 0], 0.5 * (decoded - 100.0))
+
+
+def test_three_sensors_pair_into_rows(tmp_path):
+    sensor_ids = np.tile(np.arange(3, dtype=np.uint8), 100)
+    raw = np.random.default_rng(1).integers(100, 1000, len(sensor_ids)).astype(np.uint16)
+    filename = str(tmp_path / "three.mlrec")
+    recorder = record(filename, "binary", sensor_ids, raw, (0, 1, 2))
+    assert recorder.rows_written == 100
+    recording = load_recording(filename)
+    assert recording.header["channels"] == ["LVP", "AOP", "LAP"]
+    assert np.array_equal(recording.raw, raw.reshape(-1, 3))
+
+
+def test_calibration_during_recording_converts_with_new_offsets(tmp_path):
+    sensor_ids = np.tile(np.arange(3, dtype=np.uint8), 200)
+    raw = np.random.default_rng(2).integers(100, 1000, len(sensor_ids)).astype(np.uint16)
+    timestamps = 100.0 + np.arange(len(raw)) * 0.001
+    gains = np.array([0.5, 0.6, 0.7])
+    before, after = np.array([100.0, 110.0, 120.0]), np.array([104.0, 107.0, 125.0])
+
+    filename = str(tmp_path / "calibrated.mlrec")
+    recorder = RecorderThread(filename, file_format="binary", offsets=before, gains=gains)
+    recorder.start()
+    for start in range(0, len(raw), 50):
+        part = slice(start, start + 50)
+        offsets = before if start < 250 else after      # the reader swaps in a new array, here mid-row
+        values = gains[sensor_ids[part]] * (raw[part] - offsets[sensor_ids[part]])
+        recorder.write_batch(sensor_ids[part], raw[part], values, timestamps[part], offsets=offsets)
+    recorder.stop()
+
+    # Row 83 would have mixed both calibrations; it restarts with the first new sample
+    recording = load_recording(filename)
+    assert recording.header["offset_changes"] == [[83, after.tolist()]]
+    assert recorder.rows_written == 83 + (len(raw) - 250) // 3
+    pressures = recording.pressures()
+    assert np.allclose(pressures[:83], gains * (recording.raw[:83] - before))
+    assert np.allclose(pressures[83:], gains * (recording.raw[83:] - after))
+    assert np.array_equal(recording.raw[:83], raw[:249].reshape(-1, 3))
@@ -0,0 +1,156 @@
+# test_frame_decoder.py – Round trips of the wire format decoders
+# Usage: python -m pytest tests
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_decoder import (PACKED_FRAME_SIZE, PACKED_SETS, AsciiPacketDecoder, BitpackedDecoder, PackedFrameDecoder,
+                           encode_ascii_packets, encode_bitpacked, encode_packed_frames)
+
+
+def make_samples(sets, seed=0):
+    sensor_ids = np.tile(np.arange(3, dtype=np.uint8), sets)
+    raw = np.random.default_rng(seed).integers(0, 1024, len(sensor_ids)).astype(np.uint16)
+    return sensor_ids, raw
+
+
+def decode_in_chunks(decoder, stream, sizes):
+    sensor_ids, raw, start = [], [], 0
+    for size in sizes:
+        ids, values = decoder.decode(stream[start:start + size])
+        sensor_ids.append(ids)
+        raw.append(values)
+        start += size
+    return np.concatenate(sensor_ids), np.concatenate(raw)
+
+
+@pytest.mark.parametrize("timestamps", [False, True])
+def test_packed_random_chunks_match_single_decode(timestamps):
+    sensor_ids, raw = make_samples(400)
+    set_times = np.arange(400) * 0.0005 if timestamps else None
+    stream = encode_packed_frames(sensor_ids, raw, set_times=set_times)
+
+    whole = PackedFrameDecoder(timestamps=timestamps)
+    expected_ids, expected_raw = whole.decode(stream)
+    assert np.array_equal(expected_raw, raw) and np.array_equal(expected_ids, sensor_ids)
+
+    rng = np.random.default_rng(1)
+    sizes = rng.integers(0, 2 * PACKED_FRAME_SIZE, len(stream))     # includes 0 and sub-frame reads
+    sizes = sizes[np.cumsum(sizes) <= len(stream)].tolist() + [len(stream)]
+    chunked = PackedFrameDecoder(timestamps=timestamps)
+    ids, values = decode_in_chunks(chunked, stream, sizes)
+    assert np.array_equal(ids, expected_ids)
+    assert np.array_equal(values, expected_raw)
+    assert chunked.counters == whole.counters
+
+
+def test_packed_short_read_starting_with_sync():
+    stream = encode_packed_frames(*make_samples(2 * PACKED_SETS))
+    decoder = PackedFrameDecoder()
+    ids, raw = decoder.decode(stream[:15])
+    assert len(raw) == 0
+    ids, raw = decoder.decode(stream[15:])
+    assert len(raw) == 2 * PACKED_SETS * 3
+
+
+def test_packed_damage_is_counted_not_decoded():
+    sets = 20000
+    sensor_ids, raw = make_samples(sets)
+    stream = np.frombuffer(encode_packed_frames(sensor_ids, raw), dtype=np.uint8).copy()
+    rng = np.random.default_rng(2)
+    hit = rng.random(len(stream)) < 0.005
+    stream[hit] ^= (1 << rng.integers(0, 8, hit.sum())).astype(np.uint8)
+    keep = rng.random(len(stream)) >= 0.01
+    keep[-5 * PACKED_FRAME_SIZE:] = True    # end on intact frames, a lost tail cannot be seen
+    damaged = (~keep | hit).reshape(-1, PACKED_FRAME_SIZE).any(axis=1)
+
+    decoder = PackedFrameDecoder()
+    _, values = decode_in_chunks(decoder, stream[keep].tobytes(), [256] * (len(stream) // 256 + 1))
+
+    # Every decoded frame is one that was sent, no CRC accidents reach the plot
+    frames = {tuple(frame) for frame in raw.reshape(-1, PACKED_SETS * 3).tolist()}
+    assert all(tuple(frame) in frames for frame in values.reshape(-1, PACKED_SETS * 3).tolist())
+
+    # Dropped counts exactly what did not arrive: the damaged frames plus the few intact
+    # ones that could not be confirmed because the next frame's sync byte was hit
+    counters = decoder.counters
+    assert counters["samples_decoded"] + counters["samples_dropped"] == len(raw)
+    lost = int(damaged.sum()) * PACKED_SETS * 3
+    assert lost <= counters["samples_dropped"] <= 1.1 * lost
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bitpacked_byte_loss_is_counted_in_any_chunking(seed):
+    sensor_ids, raw = make_samples(20000, seed)
+    rng = np.random.default_rng(seed + 10)
+    keep = rng.random(2 * len(raw)) >= rng.uniform(0.001, 0.03)
+    keep[:6] = keep[-6:] = True     # the decoder cannot see losses before its first or after its last sample
+    stream = np.frombuffer(encode_bitpacked(sensor_ids, raw), dtype=np.uint8)[keep].tobytes()
+    intact = keep.reshape(-1, 2).all(axis=1)
+
+    sizes = rng.integers(0, 300, len(stream) // 100)     # includes 0 and single-byte reads
+    sizes = sizes[np.cumsum(sizes) <= len(stream)].tolist() + [len(stream)]
+    decoder = BitpackedDecoder()
+    ids, values = decode_in_chunks(decoder, stream, sizes)
+
+    # Byte loss never pairs halves of two samples: exactly the intact samples come out
+    assert np.array_equal(ids, sensor_ids[intact])
+    assert np.array_equal(values, raw[intact])
+    counters = decoder.counters
+    assert counters["samples_dropped"] == np.count_nonzero(~intact)
+    assert counters["bytes_discarded"] == len(stream) - 2 * np.count_nonzero(intact)
+
+    whole = BitpackedDecoder()
+    whole.decode(stream)
+    assert whole.counters == counters
+
+
+@pytest.mark.parametrize("lost", [slice(7, 12), slice(8, 13), slice(7, 10)])
+def test_bitpacked_lost_set_is_counted_from_stray_bytes(lost):
+    # 7:12 takes samples 3, 4, 5 and 8:13 samples 4, 5, 6 (a whole set each), so the sensor
+    # order shows no gap; the stray byte left next to the hole does. 7:10 takes samples 3 and 4.
+    sensor_ids, raw = make_samples(10)
+    stream = bytearray(encode_bitpacked(sensor_ids, raw))
+    del stream[lost]
+    decoder = BitpackedDecoder()
+    ids, _ = decode_in_chunks(decoder, bytes(stream), [9, 1, len(stream)])
+    dropped = len(raw) - len(ids)
+    assert decoder.counters["samples_dropped"] == dropped
+    assert decoder.counters["bytes_discarded"] == len(stream) - 2 * len(ids)
+
+
+def test_bitpacked_stream_opened_mid_sample_is_not_a_loss():
+    sensor_ids, raw = make_samples(10)
+    decoder = BitpackedDecoder()
+    ids, _ = decoder.decode(encode_bitpacked(sensor_ids, raw)[3:])
+    assert ids[0] == 2 and len(ids) == len(raw) - 2
+    assert decoder.counters["samples_dropped"] == 0
+    assert decoder.counters["bytes_discarded"] == 1
+
+
+def test_ascii_packets_are_voltages_of_one_sensor():
+    decoder = AsciiPacketDecoder()
+    sensor_ids, raw = decoder.decode(b"#1.56,1.59,1.60,1.58;\r\n#0.00,3.27")
+    assert sensor_ids.tolist() == [0, 0, 0, 0]      # ASCII_Pressure_Values.ino reads A0 four times
+    assert raw.tolist() == [488, 497, 501, 494]     # V * 1023 / 3.27
+    assert decoder.counters["samples_dropped"] == 0
+
+
+def test_ascii_values_beyond_the_mapping_are_dropped():
+    decoder = AsciiPacketDecoder(sensor_ids=(0, 1, 2))
+    sensor_ids, raw = decoder.decode(b"#1.56,1.59,1.60,1.58;\r\n#1.00;\r\n")
+    assert sensor_ids.tolist() == [0, 1, 2, 0]
+    assert decoder.counters["samples_decoded"] == 4
+    assert decoder.counters["samples_dropped"] == 1
+
+
+def test_ascii_packets_round_trip_within_rounding():
+    _, raw = make_samples(200)
+    decoder = AsciiPacketDecoder()
+    ids, values = decode_in_chunks(decoder, encode_ascii_packets(None, raw), [7] * 2000)
+    assert np.array_equal(ids, np.zeros(len(raw)))
+    assert np.abs(values.astype(int) - raw).max() <= 2      # 0.01 V is 3.1 counts
@@ -0,0 +1,49 @@
+# test_live_plotter.py – Filter design follows the measured sample rate
+# Usage: python -m pytest tests
+
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+import pytest
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from live_plotter import LivePlotter
+from signal_filters import FIRLowPassFilter
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def feed(plotter, rate, seconds, start=100.0, batch=0.015):
+    times = start + np.arange(int(rate * seconds)) / rate
+    for first in np.arange(start, times[-1], batch):
+        part = times[(times >= first) & (times < first + batch)]
+        for name in ("LVP", "AOP"):
+            plotter.receive_batch(name, np.full(len(part), 80.0), part)
+
+
+def test_lowpass_is_redesigned_for_measured_rate(app):
+    plotter = LivePlotter(window_size=200)
+    plotter.set_filter("fir_lowpass")
+    feed(plotter, 600.0, 2.5)
+
+    assert plotter.sample_rate == pytest.approx(600.0, rel=0.01)
+    expected = FIRLowPassFilter(cutoff=20.0, sample_rate=plotter.sample_rate).coefficients
+    for name in plotter.ordered_names:
+        assert np.allclose(plotter.channels[name]['filter'].coefficients, expected)
+
+
+def test_small_rate_changes_keep_the_filters(app):
+    plotter = LivePlotter(window_size=200)
+    plotter.set_filter("fir_lowpass")
+    designed = plotter.channels["LVP"]['filter']
+    feed(plotter, 950.0, 2.5)
+
+    assert plotter.sample_rate == 1000.0
+    assert plotter.channels["LVP"]['filter'] is designed
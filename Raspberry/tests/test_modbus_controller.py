@@ -0,0 +1,61 @@
+# test_modbus_controller.py – Which writes RegisterCache lets through to a simulated drive
+# Usage: python -m pytest tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from drive_simulator import DriveSimulator
+from modbus_controller import ModbusController
+
+
+@pytest.fixture
+def drive():
+    drive = DriveSimulator(latency=0.0).start()
+    yield drive
+    drive.close()
+
+
+@pytest.fixture
+def modbus(drive):
+    modbus = ModbusController(port=drive.port)
+    yield modbus
+    modbus.close()
+
+
+def written(drive, since=0):
+    return [(address, value) for _, address, value in drive.write_log[since:]]
+
+
+def test_unchanged_values_are_skipped(drive, modbus):
+    modbus.set_motor_parameters(60, 1.5)
+    assert sorted(address for address, _ in written(drive)) == [0x621A, 0x621B, 0x6223]
+
+    count = len(drive.write_log)
+    modbus.set_motor_parameters(60, 1.5)
+    assert written(drive, count) == []
+
+    # Only the speeds change with the frequency, the target position stays
+    modbus.set_motor_parameters(90, 1.5)
+    assert sorted(address for address, _ in written(drive, count)) == [0x621B, 0x6223]
+
+
+def test_control_registers_are_always_sent(drive, modbus):
+    # Writing the same command again triggers it again, so repeats must reach the drive
+    modbus.start_motor()
+    modbus.start_motor()
+    modbus.stop_motor()
+    modbus.stop_motor()
+    assert written(drive) == [(0x6002, 0x0013)] * 2 + [(0x6002, 0x0040), (0x2009, 0x0001)] * 2
+
+
+@pytest.mark.parametrize("clear", ["connect", "reset_motor_position"])
+def test_cache_is_cleared(drive, modbus, clear):
+    modbus.set_motor_parameters(60, 1.5)
+    getattr(modbus, clear)()
+
+    count = len(drive.write_log)
+    modbus.set_motor_parameters(60, 1.5)
+    assert sorted(address for address, _ in written(drive, count)) == [0x621A, 0x621B, 0x6223]
@@ -0,0 +1,105 @@
+# test_modbus_worker.py – Command results and connection states reported by ModbusWorker
+# Usage: python -m pytest tests
+
+import os
+import sys
+import time
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from drive_simulator import DriveSimulator
+from modbus_controller import ModbusController
+from modbus_worker import ModbusWorker
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def wait_for(app, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    app.processEvents()
+    return condition()
+
+
+@pytest.fixture
+def drive():
+    drive = DriveSimulator(latency=0.0).start()
+    yield drive
+    drive.close()
+
+
+def start_worker(port, **kwargs):
+    worker = ModbusWorker(ModbusController(port=port), **kwargs)
+    states = []
+    worker.connection_state_changed.connect(states.append)
+    worker.start()
+    return worker, states
+
+
+def test_silent_drive_at_startup_is_disconnected(app, drive):
+    drive.timeout_rate = 1.0
+    worker, states = start_worker(drive.port, min_backoff=5.0)
+    try:
+        assert wait_for(app, lambda: states)
+    finally:
+        worker.stop()
+    assert states[0] == "disconnected"    # before any "reconnecting" to a drive never seen
+
+
+def test_one_missed_probe_keeps_the_link(app, drive):
+    worker, states = start_worker(drive.port, probe_interval=0.2, min_backoff=0.2)
+    try:
+        assert wait_for(app, lambda: states == ["connected"])
+        drive.timeout_rate = 1.0
+        assert wait_for(app, lambda: drive.errors_injected == 1)
+        drive.timeout_rate = 0.0
+        served = drive.requests_served
+        assert wait_for(app, lambda: drive.requests_served >= served + 2)
+        assert states == ["connected"]
+
+        drive.timeout_rate = 1.0
+        assert wait_for(app, lambda: "disconnected" in states)
+    finally:
+        worker.stop()
+    assert drive.errors_injected >= 3     # the single miss above, then two in a row
+    assert states[:2] == ["connected", "disconnected"]
+
+
+def test_offline_stop_is_reported_failed(app):
+    worker = ModbusWorker(ModbusController(port="/dev/does-not-exist"), min_backoff=5.0)
+    finished, failed = [], []
+    worker.command_finished.connect(lambda name, latency: finished.append(name))
+    worker.command_failed.connect(lambda name, message: failed.append((name, message)))
+    worker.start()
+    try:
+        worker.stop_motor()
+        worker.set_motor_parameters(60, 1.5)
+        assert wait_for(app, lambda: len(failed) == 2)
+    finally:
+        worker.stop()
+    assert failed == [("stop_motor", "offline"), ("motor_parameters", "offline")]
+    assert finished == []
+
+
+def test_unconfirmed_stop_is_reported_failed(app, drive):
+    worker, states = start_worker(drive.port, probe_interval=30.0)
+    finished, failed = [], []
+    worker.command_finished.connect(lambda name, latency: finished.append(name))
+    worker.command_failed.connect(lambda name, message: failed.append((name, message)))
+    try:
+        assert wait_for(app, lambda: states == ["connected"])
+        drive.timeout_rate = 1.0
+        worker.stop_motor()
+        assert wait_for(app, lambda: failed)
+    finally:
+        worker.stop()
+    assert failed == [("stop_motor", "write to 0x6002, 0x2009 not confirmed")]
+    assert finished == []
+    assert drive.errors_injected == 2     # both writes were tried
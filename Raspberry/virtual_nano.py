@@ -0,0 +1,190 @@
+# virtual_nano.py – Software stand-in for the Arduino Nano running bitpacked_pressure_sender.ino
+#
+# Streams synthetic LVP/AOP/LAP waveforms in the bitpacked 2-byte-per-sample protocol
+# (or any other format in frame_decoder.ENCODERS) onto a pseudo-terminal, so
+# SensorReaderThread and the GUI can run without hardware.
+# A pty has no baud rate, so sample rates far above the 115200 baud ceiling work too.
+# Usage: python virtual_nano.py [sample_rate]   (prints the port to open)
+
+import os
+import sys
+import threading
+import time
+import tty
+
+import numpy as np
+
+from frame_decoder import ENCODERS, NUM_SENSORS, PACKED_SETS
+
+# Same calibration SensorReaderThread starts with, so the GUI shows the intended mmHg
+DEFAULT_OFFSETS = (118, 135, 123)
+DEFAULT_GAINS = (330 / (932 - 118), 330 / (920 - 135), 330 / (914 - 123))
+
+
+def cardiac_waveforms(t, heart_rate=60.0, systolic=120.0, diastolic=80.0, lv_diastolic=8.0, lap_mean=10.0):
+    """
+    Simple periodic LVP, AOP and LAP curves in mmHg.
+
+    Systole takes the first third of every cycle (as the pump's forward stroke
+    does). The aorta follows the ventricle while the valve is open and then
+    decays exponentially towards diastolic pressure.
+
+    Args:
+    - t (np.ndarray): times in seconds
+    - heart_rate (float): BPM
+
+    Returns:
+    - np.ndarray: (3, len(t)) pressures in sensor_id order (LVP, AOP, LAP)
+    """
+    phase = (np.asarray(t) * heart_rate / 60.0) % 1.0
+    systole = 1 / 3
+
+    ejection = np.sin(np.pi * np.minimum(phase, systole) / systole)
+    lvp = lv_diastolic + (systolic - lv_diastolic) * np.where(phase < systole, ejection, 0.0)
+
+    since_peak = (phase - systole / 2) % 1.0
+    aop = np.maximum(lvp, diastolic + (systolic - diastolic) * np.exp(-since_peak / 0.35))
+
+    lap = lap_mean + 4.0 * np.sin(2 * np.pi * phase) + 2.0 * np.sin(4 * np.pi * phase)
+    return np.vstack((lvp, aop, lap))
+
+
+class VirtualNano:
+    """
+    Writes the Nano's byte stream to a pty from a background thread.
+
+    Args:
+    - sample_rate (float): sample sets per second (one sample of each sensor per set)
+    - heart_rate (float): BPM of the synthetic waveforms
+    - noise (float): standard deviation of the added ADC noise in counts
+    - byte_loss (float): probability that a byte is dropped
+    - corruption (float): probability that a byte has one bit flipped
+    - chunk_interval (float): s between writes; each write carries the sets due by then
+    - protocol (str): wire format, a key of frame_decoder.ENCODERS
+    - timestamps (bool): "packed" frames carry micros() stamps
+    - clock_drift (float): ppm the Nano's clock runs fast against the host (resonators are off by up to ~1000)
+    """
+
+    def __init__(self, sample_rate=1000.0, heart_rate=60.0, noise=1.0, byte_loss=0.0, corruption=0.0,
+                 offsets=DEFAULT_OFFSETS, gains=DEFAULT_GAINS, chunk_interval=0.002, protocol="bitpacked",
+                 timestamps=False, clock_drift=0.0, seed=None):
+        self.sample_rate = sample_rate
+        self.protocol = protocol
+        self.encode = ENCODERS[protocol]
+        self.frame_sets = PACKED_SETS if protocol == "packed" else 1     # sets that go out together
+        self.timestamps = timestamps
+        self.clock_rate = 1 + clock_drift * 1e-6     # device seconds per host second
+        self.started = None                         # time.monotonic() of set 0
+        self.heart_rate = heart_rate
+        self.noise = noise
+        self.byte_loss = byte_loss
+        self.corruption = corruption
+        self.offsets = np.asarray(offsets, dtype=float)
+        self.gains = np.asarray(gains, dtype=float)
+        self.chunk_interval = chunk_interval
+        self.rng = np.random.default_rng(seed)
+
+        self.sets_sent = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self.bytes_corrupted = 0
+
+        self._master, slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave         # kept open so the pty survives the reader reopening it
+        self._thread = None
+        self._running = False
+
+    def set_times(self, first_set, count):
+        """Device clock (s) of sample sets first_set .. first_set + count - 1."""
+        return (first_set + np.arange(count)) / self.sample_rate
+
+    def host_times(self, first_set, count):
+        """time.monotonic() at which the sets were taken."""
+        return self.started + self.set_times(first_set, count) / self.clock_rate
+
+    def samples(self, first_set, count):
+        """(sensor_ids, raw) of sample sets first_set .. first_set + count - 1, in sending order."""
+        t = self.set_times(first_set, count)
+        pressures = cardiac_waveforms(t, self.heart_rate)
+        counts = pressures / self.gains[:, None] + self.offsets[:, None]
+        if self.noise:
+            counts += self.rng.normal(0.0, self.noise, counts.shape)
+        raw = np.clip(np.round(counts), 0, 1023).astype(np.uint16)
+
+        # Column-major: sensor 0, 1, 2 of the first set, then of the next set, ...
+        sensor_ids = np.tile(np.arange(NUM_SENSORS, dtype=np.uint8), count)
+        return sensor_ids, raw.T.ravel()
+
+    def _encode(self, first_set, count):
+        sensor_ids, raw = self.samples(first_set, count)
+        if self.frame_sets > 1:
+            set_times = self.set_times(first_set, count) if self.timestamps else None
+            return self.encode(sensor_ids, raw, sequence=first_set // self.frame_sets, set_times=set_times)
+        return self.encode(sensor_ids, raw)
+
+    def _impair(self, data):
+        """Applies byte loss and single-bit corruption."""
+        if not self.byte_loss and not self.corruption:
+            return data
+        array = np.frombuffer(data, dtype=np.uint8).copy()
+        if self.corruption:
+            hit = self.rng.random(len(array)) < self.corruption
+            array[hit] ^= (1 << self.rng.integers(0, 8, hit.sum())).astype(np.uint8)
+            self.bytes_corrupted += int(hit.sum())
+        if self.byte_loss:
+            keep = self.rng.random(len(array)) >= self.byte_loss
+            self.bytes_dropped += int(len(array) - keep.sum())
+            array = array[keep]
+        return array.tobytes()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._stream, name="VirtualNano", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _stream(self):
+        self.started = time.monotonic()
+        while self._running:
+            due = int((time.monotonic() - self.started) * self.clock_rate * self.sample_rate)
+            count = (due - self.sets_sent) // self.frame_sets * self.frame_sets
+            if count > 0:
+                data = self._impair(self._encode(self.sets_sent, count))
+                try:
+                    os.write(self._master, data)     # blocks while the reader is behind
+                except OSError:
+                    break
+                self.sets_sent += count
+                self.bytes_sent += len(data)
+            time.sleep(self.chunk_interval)
+
+    @property
+    def byte_rate(self):
+        """Bytes per second of the undamaged stream (a real Nano at 115200 baud manages 11520)."""
+        sets = 100
+        return self.sample_rate * len(self._encode(0, sets)) / sets
+
+
+if __name__ == "__main__":
+    nano = VirtualNano(sample_rate=float(sys.argv[1]) if len(sys.argv) > 1 else 1000.0).start()
+    print(f"[VirtualNano] Streaming {nano.sample_rate:g} sets/s ({nano.byte_rate / 1000:.1f} kB/s) "
+          f"on {nano.port} (Ctrl+C to quit)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        nano.close()
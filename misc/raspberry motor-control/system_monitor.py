@@ -1,7 +1,9 @@
 # system_monitor.py
 
+import sys
+
 from pymodbus.client.sync import ModbusSerialClient as ModbusClient
-from register_maps import REGISTER_CATEGORIES 
+from register_map import REGISTER_CATEGORIES 
 
 class SystemMonitor:
     def __init__(self, port='/dev/com2', baudrate=115200, unit_id=1):
@@ -49,7 +51,8 @@ class SystemMonitor:
     
 
 if __name__ == "__main__":
-    monitor = SystemMonitor()
+    # Optional port, e.g. the pty printed by Raspberry/drive_simulator.py
+    monitor = SystemMonitor(port=sys.argv[1]) if len(sys.argv) > 1 else SystemMonitor()
 
     monitor.check_registers("startup", REGISTER_CATEGORIES["startup"])
     monitor.check_registers("homing_check", REGISTER_CATEGORIES["homing_check"])